@@ -1,16 +1,20 @@
 from typing import Sequence, TypedDict, Annotated, Union, List
-from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
+from langchain_core.messages import BaseMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.runnables import RunnableConfig
 from .base_agent import BaseAgent, AgentConfig
-import json
+from .history import HistoryManager
+from tools.tool_executor import aexecute_tool_calls, execute_tool_calls
 from langchain.schema import HumanMessage
 
+ROUTER_MODEL_ID = "llama3-groq-70b-8192-tool-use-preview"
+
 class AgentState(TypedDict):
     """The state of the agent."""
     messages: Annotated[Sequence[BaseMessage], add_messages]
     collected_info: List[str]
+    route: str
 
 class AdvancedReactAgent(BaseAgent):
     """
@@ -19,11 +23,18 @@ class AdvancedReactAgent(BaseAgent):
     2. If tools are needed, executes them and returns to router
     3. If final response needed, passes to Response LLM for detailed answer
     """
+
+    # Only the response model's answer is shown; router output is internal
+    STREAM_NODES = ("response", "direct")
     
-    def __init__(self, config: AgentConfig):
-        super().__init__(config)
+    def __init__(self, config: AgentConfig, model_factory=None):
+        super().__init__(config, model_factory)
         # Override router model with fast model for routing decisions
-        self.router_model = self._create_traced_model("llama3-groq-70b-8192-tool-use-preview")
+        self.router_model = self._create_traced_model(ROUTER_MODEL_ID)
+        # The router sees the full history, so trim against its context window
+        self.history = HistoryManager(
+            self.router_model, self.config.get_model_config(ROUTER_MODEL_ID).context_length
+        )
         # Use the configured model (typically more powerful) for responses
         self.response_model = self._create_traced_model(self.config.model_id)
 
@@ -41,40 +52,48 @@ class AdvancedReactAgent(BaseAgent):
         router_model = self.router_model.bind_tools(tools)
         response_model = self.response_model
         
-        def router_node(state: AgentState, config: RunnableConfig):
-            """Node for routing decisions"""
-            system_msg = SystemMessage(content="""
+        router_system_msg = SystemMessage(content="""
             You are a routing agent. Your job is to either:
             1. Use tools to gather information (respond with tool calls)
             2. Signal that you have enough information (respond with "FINAL_ANSWER")
             
             Only respond with "FINAL_ANSWER" when you have all needed information.
             """)
-            
+        
+        def router_node(state: AgentState, config: RunnableConfig):
+            """Node for routing decisions"""
             # Initialize collected_info if not present
             if "collected_info" not in state:
                 state["collected_info"] = []
             
-            response = router_model.invoke([system_msg] + state["messages"], config)
+            response = router_model.invoke(self._build_prompt(router_system_msg, state["messages"], config), config)
+            return {"messages": [response], "collected_info": state["collected_info"]}
+
+        async def arouter_node(state: AgentState, config: RunnableConfig):
+            """Async node for routing decisions"""
+            if "collected_info" not in state:
+                state["collected_info"] = []
+            
+            prompt = await self._abuild_prompt(router_system_msg, state["messages"], config)
+            response = await router_model.ainvoke(prompt, config)
             return {"messages": [response], "collected_info": state["collected_info"]}
 
-        def tool_node(state: AgentState):
+        def tool_node(state: AgentState, config: RunnableConfig):
             """Node for executing tools"""
-            outputs = []
-            for tool_call in state["messages"][-1].tool_calls:
-                tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-                state["collected_info"].append(f"{tool_call['name']}: {tool_result}")
-                outputs.append(
-                    ToolMessage(
-                        content=json.dumps(tool_result),
-                        name=tool_call["name"],
-                        tool_call_id=tool_call["id"],
-                    )
-                )
+            outputs = execute_tool_calls(state["messages"][-1].tool_calls, tools_by_name, config)
+            for output in outputs:
+                state["collected_info"].append(f"{output.name}: {output.content}")
             return {"messages": outputs, "collected_info": state["collected_info"]}
 
-        def response_node(state: AgentState, config: RunnableConfig):
-            """Node for generating final response"""
+        async def atool_node(state: AgentState, config: RunnableConfig):
+            """Async node for executing tools"""
+            outputs = await aexecute_tool_calls(state["messages"][-1].tool_calls, tools_by_name, config)
+            for output in outputs:
+                state["collected_info"].append(f"{output.name}: {output.content}")
+            return {"messages": outputs, "collected_info": state["collected_info"]}
+
+        def response_messages(state: AgentState):
+            """Build the response model's prompt from the collected information"""
             collected_info_text = "\n".join(state["collected_info"])
             system_msg = SystemMessage(content=f"""
             You are a response generator. Using the collected information, 
@@ -88,11 +107,31 @@ class AdvancedReactAgent(BaseAgent):
             user_query = state["messages"][-1].content
             
             # Create a new message list with just the system message and query
-            messages = [system_msg, HumanMessage(content=user_query)]
-            
-            response = response_model.invoke(messages, config)
+            return [system_msg, HumanMessage(content=user_query)]
+
+        def response_node(state: AgentState, config: RunnableConfig):
+            """Node for generating final response"""
+            response = response_model.invoke(response_messages(state), config)
+            return {"messages": [response], "collected_info": state["collected_info"]}
+
+        async def aresponse_node(state: AgentState, config: RunnableConfig):
+            """Async node for generating final response"""
+            response = await response_model.ainvoke(response_messages(state), config)
             return {"messages": [response], "collected_info": state["collected_info"]}
 
+        def direct_node(state: AgentState, config: RunnableConfig):
+            """Node answering a message that needs no tools in one call, with the conversation so far"""
+            system_msg = SystemMessage(content=self.config.system_prompt)
+            response = response_model.invoke(self._build_prompt(system_msg, state["messages"], config), config)
+            return {"messages": [response]}
+
+        async def adirect_node(state: AgentState, config: RunnableConfig):
+            """Async node answering a message that needs no tools in one call"""
+            system_msg = SystemMessage(content=self.config.system_prompt)
+            prompt = await self._abuild_prompt(system_msg, state["messages"], config)
+            response = await response_model.ainvoke(prompt, config)
+            return {"messages": [response]}
+
         def should_continue(state: AgentState):
             """Edge condition for determining next node"""
             last_message = state["messages"][-1]
@@ -106,12 +145,14 @@ class AdvancedReactAgent(BaseAgent):
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("router", router_node)
-        workflow.add_node("tools", tool_node)
-        workflow.add_node("response", response_node)
+        self._add_node(workflow, "router", router_node, arouter_node)
+        self._add_node(workflow, "tools", tool_node, atool_node)
+        self._add_node(workflow, "response", response_node, aresponse_node)
         
-        # Set entry point
-        workflow.set_entry_point("router")
+        # Set entry point; messages needing no tools skip the router call and
+        # go to the response model with the history, since "summarize that"
+        # needs more than the last message
+        self._set_entry(workflow, tools, "router", "direct", (direct_node, adirect_node))
         
         # Add edges
         workflow.add_conditional_edges(
@@ -125,4 +166,4 @@ class AdvancedReactAgent(BaseAgent):
         workflow.add_edge("tools", "router")
         workflow.add_edge("response", END)
         
-        return workflow.compile() 
\ No newline at end of file
+        return workflow.compile(checkpointer=self.memory) 
\ No newline at end of file
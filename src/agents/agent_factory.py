@@ -0,0 +1,20 @@
+from config.agent_config import AgentConfig
+from .base_agent import BaseAgent
+from .react_agent import ReactAgent
+from .react_human_agent import ReactHumanAgent
+from .advanced_react_agent import AdvancedReactAgent
+from .plain_agent import PlainAgent
+
+# Registry of agent classes by agent type
+AGENT_TYPES = {
+    "react": ReactAgent,
+    "react_human": ReactHumanAgent,
+    "advanced_react": AdvancedReactAgent,
+    "plain": PlainAgent,
+}
+
+def create_agent_instance(agent_config: AgentConfig, model_factory=None) -> BaseAgent:
+    """Create appropriate agent instance based on type"""
+    if agent_config.agent_type not in AGENT_TYPES:
+        raise ValueError(f"Unknown agent type: {agent_config.agent_type}")
+    return AGENT_TYPES[agent_config.agent_type](agent_config, model_factory)
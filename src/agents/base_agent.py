@@ -1,29 +1,160 @@
 from abc import ABC, abstractmethod
 from config.agent_config import AgentConfig
-from langgraph.checkpoint.memory import MemorySaver
+from .checkpointing import get_checkpointer
+from .history import HistoryManager
+from .intent_router import DIRECT, TOOLS, get_intent_router, route_message
+from .streaming import astream_agent_events, stream_agent_events
+from .tracing import get_tracer, with_callback
+from utils.tokens import count_message_tokens
 from langchain_community.chat_models import ChatLiteLLM
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END
 
 
 class BaseAgent(ABC):
-    def __init__(self, config: AgentConfig):
+    # Graph nodes whose model tokens are streamed to the user
+    STREAM_NODES = ("agent", "direct")
+
+    def __init__(self, config: AgentConfig, model_factory=None):
         self.config = config
-        # Initialize memory for all agents
-        self.memory = MemorySaver()
+        # Optional (model_id, config) -> chat model hook, e.g. fakes for benchmarks
+        self.model_factory = model_factory
+        # Conversation state lives in the shared checkpointer, keyed by thread_id
+        self.memory = get_checkpointer()
         # Initialize primary model for all agents with tracing
         self.model = self._create_traced_model(self.config.model_id)
         # Initialize secondary model if specified
         self.secondary_model = None
         if hasattr(self.config, 'secondary_model_id') and self.config.secondary_model_id:
             self.secondary_model = self._create_traced_model(self.config.secondary_model_id)
+        # Keep prompts within the primary model's context window
+        self.history = HistoryManager(self.model, self.config.get_model_config().context_length)
+        self._graph = None
         
     def _create_traced_model(self, model_id):
         """Create a traced model instance"""
+        if self.model_factory is not None:
+            return self.model_factory(model_id, self.config)
         model_config = self.config.get_model_config(model_id)
         return ChatLiteLLM(
             model=f"{model_config.provider}/{model_id}",
             temperature=self.config.temperature
         )
     
+    def _build_prompt(self, system_msg, messages, config):
+        """Prefix the system message to the trimmed conversation history"""
+        history = self.history.prepare(messages, config, reserved_tokens=count_message_tokens(system_msg))
+        return [system_msg] + history
+    
+    async def _abuild_prompt(self, system_msg, messages, config):
+        """Async version of _build_prompt"""
+        history = await self.history.aprepare(messages, config, reserved_tokens=count_message_tokens(system_msg))
+        return [system_msg] + history
+    
+    def _add_node(self, workflow, name, func, afunc=None):
+        """Add a node that runs func under invoke/stream and afunc under ainvoke/astream"""
+        workflow.add_node(name, RunnableLambda(func, afunc=afunc, name=name))
+    
+    def _set_entry(self, workflow, tools, tools_node, direct_node, direct=None):
+        """
+        Enter the graph at tools_node, or with the intent router on, at an
+        "intent" node sending messages that need no tools to direct_node.
+        direct is an optional (func, afunc) pair adding direct_node as a
+        one-call node that ends the turn.
+        """
+        router = get_intent_router()
+        if router is None:
+            workflow.set_entry_point(tools_node)
+            return
+        has_tools = bool(tools)
+        self._add_node(workflow, "intent", lambda state: route_message(router, state["messages"], has_tools))
+        if direct is not None:
+            self._add_node(workflow, direct_node, *direct)
+            workflow.add_edge(direct_node, END)
+        workflow.set_entry_point("intent")
+        workflow.add_conditional_edges("intent", lambda state: state["route"], {
+            DIRECT: direct_node,
+            TOOLS: tools_node,
+        })
+    
+    def get_graph(self):
+        """Get the compiled graph, creating it on first use"""
+        if self._graph is None:
+            self._graph = self.create()
+        return self._graph
+    
+    def record_turn(self, config, prompt, answer):
+        """Append a turn answered outside the graph (e.g. from cache) to the thread"""
+        self.record_messages(config, [HumanMessage(content=prompt), AIMessage(content=answer)])
+    
+    def record_messages(self, config, messages):
+        """Append messages produced outside the graph to the thread"""
+        self.get_graph().update_state(config, {"messages": messages}, as_node=self.STREAM_NODES[0])
+    
+    def restore_thread(self, config, load_messages) -> bool:
+        """
+        Seed a thread that has no checkpoint state with load_messages(), e.g.
+        the stored history after a restart or on another replica. The
+        callable only runs when the thread is empty.
+        """
+        if self.get_graph().get_state(config).values.get("messages"):
+            return False
+        messages = load_messages()
+        if messages:
+            self.record_messages(config, messages)
+        return bool(messages)
+    
+    def _start_trace(self, config):
+        """Attach a trace collector for one turn to the graph config"""
+        collector = get_tracer().start_turn(config, self.config)
+        return collector, with_callback(config, collector)
+    
+    def invoke(self, inputs, config):
+        """Run the graph to completion"""
+        collector, config = self._start_trace(config)
+        try:
+            return self.get_graph().invoke(inputs, config=config)
+        finally:
+            get_tracer().finish(collector)
+    
+    async def ainvoke(self, inputs, config):
+        """Run the graph to completion without blocking a thread on model calls"""
+        collector, config = self._start_trace(config)
+        try:
+            return await self.get_graph().ainvoke(inputs, config=config)
+        finally:
+            get_tracer().finish(collector)
+    
+    def stream(self, inputs, config):
+        """Stream StreamEvents from a graph run; the final event carries the turn's trace"""
+        collector, config = self._start_trace(config)
+        finished = False
+        try:
+            for event in stream_agent_events(self.get_graph(), inputs, config, self.STREAM_NODES):
+                if event.kind == "final":
+                    event.trace = get_tracer().finish(collector)
+                    finished = True
+                yield event
+        finally:
+            # Failed, cancelled and abandoned turns still reach the sinks
+            if not finished:
+                get_tracer().finish(collector)
+    
+    async def astream(self, inputs, config):
+        """Stream StreamEvents from an async graph run; the final event carries the turn's trace"""
+        collector, config = self._start_trace(config)
+        finished = False
+        try:
+            async for event in astream_agent_events(self.get_graph(), inputs, config, self.STREAM_NODES):
+                if event.kind == "final":
+                    event.trace = get_tracer().finish(collector)
+                    finished = True
+                yield event
+        finally:
+            if not finished:
+                get_tracer().finish(collector)
+    
     @abstractmethod
     def create(self):
         """Create and return the agent instance"""
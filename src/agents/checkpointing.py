@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from config.performance_config import PERFORMANCE_CONFIG
+
+_checkpointer = None
+_lock = threading.Lock()
+
+def _threaded_sqlite_saver_class():
+    """Build a SqliteSaver subclass whose async methods run on worker threads"""
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as e:
+        raise ImportError(
+            "The sqlite checkpoint backend requires langgraph-checkpoint-sqlite"
+        ) from e
+
+    class ThreadedSqliteSaver(SqliteSaver):
+        """
+        SqliteSaver that also supports the async graph API.
+
+        Checkpoint reads and writes are short local queries, so running them
+        in the default executor is cheap next to the LLM calls they surround,
+        and the same file serves both the sync and async paths.
+        """
+
+        async def aget_tuple(self, config):
+            return await asyncio.get_running_loop().run_in_executor(None, self.get_tuple, config)
+
+        async def alist(self, config, **kwargs):
+            checkpoints = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: list(self.list(config, **kwargs))
+            )
+            for checkpoint in checkpoints:
+                yield checkpoint
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.put, config, checkpoint, metadata, new_versions
+            )
+
+        async def aput_writes(self, config, writes, task_id, *args):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.put_writes, config, writes, task_id, *args
+            )
+
+    return ThreadedSqliteSaver
+
+def _create_sqlite_checkpointer(db_path: str) -> BaseCheckpointSaver:
+    """Create a checkpointer backed by a local SQLite file"""
+    SqliteSaver = _threaded_sqlite_saver_class()
+
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Streamlit runs each session on its own thread; SqliteSaver serializes access
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    return SqliteSaver(conn)
+
+def create_checkpointer(backend: str, db_path: str = None) -> BaseCheckpointSaver:
+    """Create a checkpointer for the given backend"""
+    if backend == "memory":
+        return MemorySaver()
+    if backend == "sqlite":
+        return _create_sqlite_checkpointer(db_path or PERFORMANCE_CONFIG.checkpoint_db_path)
+    raise ValueError(f"Unknown checkpoint backend: {backend}")
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """Get the process-wide checkpointer shared by all compiled graphs"""
+    global _checkpointer
+    with _lock:
+        if _checkpointer is None:
+            _checkpointer = create_checkpointer(PERFORMANCE_CONFIG.checkpoint_backend)
+        return _checkpointer
+
+def delete_thread(thread_id: str):
+    """Drop every checkpoint of a thread that no chat will continue"""
+    get_checkpointer().delete_thread(thread_id)
@@ -0,0 +1,90 @@
+"""
+Scripted chat model for running agent graphs without a provider.
+
+Used wherever a graph has to be built or exercised offline: drawing agent
+diagrams and the benchmarks.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+class FakeChatModel(BaseChatModel):
+    """
+    Scripted chat model with configurable latency and token counts.
+
+    Its reply depends only on the conversation: while tools are bound and
+    fewer than tool_rounds tool-calling replies have been made since the
+    last human message, it calls every bound tool (up to
+    tool_calls_per_round of them); otherwise it answers. That keeps it
+    deterministic across concurrent sessions without shared state.
+    """
+
+    model_name: str = "fake"
+    latency: float = 0.0
+    latency_per_token: float = 0.0
+    completion_tokens: int = 50
+    tool_rounds: int = 1
+    tool_calls_per_round: int = 2
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tool_names": [tool.name for tool in tools]})
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        """Next message for a conversation"""
+        rounds = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, AIMessage) and message.tool_calls:
+                rounds += 1
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4 + 1
+
+        if self.tool_names and rounds < self.tool_rounds:
+            names = self.tool_names[:self.tool_calls_per_round]
+            tool_calls = [
+                {"name": name, "args": {"query": f"round {rounds} {name}"}, "id": f"call_{rounds}_{index}"}
+                for index, name in enumerate(names)
+            ]
+            return AIMessage(content="", tool_calls=tool_calls, usage_metadata={
+                "input_tokens": prompt_tokens, "output_tokens": 20 * len(tool_calls),
+                "total_tokens": prompt_tokens + 20 * len(tool_calls),
+            })
+
+        content = " ".join(["lorem"] * self.completion_tokens)
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": prompt_tokens, "output_tokens": self.completion_tokens,
+            "total_tokens": prompt_tokens + self.completion_tokens,
+        })
+
+    def _delay(self) -> float:
+        return self.latency + self.latency_per_token * self.completion_tokens
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self._delay():
+            time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        if self._delay():
+            await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+def fake_model_factory(**settings):
+    """Model factory for BaseAgent that builds FakeChatModels"""
+    def factory(model_id: str, config) -> FakeChatModel:
+        return FakeChatModel(model_name=model_id, **settings)
+    return factory
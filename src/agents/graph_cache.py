@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Tuple
+from config.agent_config import AgentConfig
+from config.performance_config import PERFORMANCE_CONFIG
+from .agent_factory import create_agent_instance
+from .base_agent import BaseAgent
+
+
+class GraphCache:
+    """
+    Process-wide LRU cache of agent instances and their compiled graphs.
+
+    Entries are keyed by AgentConfig.cache_key(), so every session using the
+    same configuration shares one model client, one bind_tools call and one
+    compiled graph.
+    """
+
+    def __init__(self, max_size: int, model_factory=None):
+        self.max_size = max_size
+        # Passed to every agent built by this cache, e.g. fake models for load tests
+        self.model_factory = model_factory
+        self._entries: "OrderedDict[str, Tuple[BaseAgent, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, agent_config: AgentConfig) -> Tuple[BaseAgent, Any]:
+        """Return (agent_instance, compiled_graph), building them on a miss"""
+        key = agent_config.cache_key()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock so a slow compile doesn't block other configs
+        agent_instance = create_agent_instance(agent_config, self.model_factory)
+        entry = (agent_instance, agent_instance.get_graph())
+
+        with self._lock:
+            # Another thread may have built the same config in the meantime
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, agent_config: AgentConfig):
+        """Drop the cached graph for a configuration"""
+        with self._lock:
+            self._entries.pop(agent_config.cache_key(), None)
+
+    def clear(self):
+        """Drop all cached graphs"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared by every Streamlit session in the process
+graph_cache = GraphCache(PERFORMANCE_CONFIG.graph_cache_size)
+
+def get_cached_agent(agent_config: AgentConfig) -> Tuple[BaseAgent, Any]:
+    """Get the cached agent instance and compiled graph for a configuration"""
+    return graph_cache.get(agent_config)
+
+def invalidate_agent(agent_config: AgentConfig):
+    """Invalidate the cached graph for a configuration"""
+    graph_cache.invalidate(agent_config)
@@ -0,0 +1,172 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+from config.performance_config import PERFORMANCE_CONFIG
+from utils.tokens import count_message_tokens, message_text
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an AI assistant.
+Keep names, facts, decisions and open questions. Be concise: at most {max_words} words.
+
+Current summary:
+{summary}
+
+New messages to fold in:
+{transcript}
+
+Updated summary:"""
+
+# Tool output is usually long and mostly noise once it has been answered
+TOOL_OUTPUT_SUMMARY_CHARS = 500
+
+@dataclass
+class _ThreadSummary:
+    folded_count: int
+    text: str
+
+def _thread_id(config: Optional[dict]) -> Optional[str]:
+    """Get the checkpoint thread id from a runnable config"""
+    return (config or {}).get("configurable", {}).get("thread_id")
+
+class HistoryManager:
+    """
+    Keeps the prompt for each model call within a fraction of the model's
+    context window.
+
+    The most recent turns are sent verbatim. Older turns are folded into a
+    rolling summary that is extended incrementally and cached per thread,
+    so each summarization call only sees messages that dropped out of the
+    window since the previous call.
+    """
+
+    def __init__(self, model, context_length: int, fraction: float = None,
+                 max_threads: int = None):
+        self.model = model
+        self.fraction = fraction or PERFORMANCE_CONFIG.history_context_fraction
+        self.budget = int(context_length * self.fraction)
+        self.max_threads = max_threads or PERFORMANCE_CONFIG.history_summary_cache_size
+        self._summaries: "OrderedDict[str, _ThreadSummary]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def prepare(self, messages: Sequence[BaseMessage], config: dict = None,
+                reserved_tokens: int = 0) -> List[BaseMessage]:
+        """Return the messages to send, trimmed and prefixed with a summary"""
+        messages = list(messages)
+        cut = self._find_cut(messages, self.budget - reserved_tokens)
+        if cut == 0:
+            return messages
+
+        thread_id = _thread_id(config)
+        cached = self._cached_summary(thread_id, messages, cut)
+        summary = cached.text
+        if cached.folded_count < cut:
+            try:
+                summary = self._extend_summary(cached.text, messages[cached.folded_count:cut])
+                self._store_summary(thread_id, cut, summary)
+            except Exception:
+                logger.warning("History summarization failed; trimming without summary", exc_info=True)
+        return self._with_summary(summary, messages[cut:])
+
+    async def aprepare(self, messages: Sequence[BaseMessage], config: dict = None,
+                       reserved_tokens: int = 0) -> List[BaseMessage]:
+        """Async version of prepare"""
+        messages = list(messages)
+        cut = self._find_cut(messages, self.budget - reserved_tokens)
+        if cut == 0:
+            return messages
+
+        thread_id = _thread_id(config)
+        cached = self._cached_summary(thread_id, messages, cut)
+        summary = cached.text
+        if cached.folded_count < cut:
+            try:
+                summary = await self._aextend_summary(cached.text, messages[cached.folded_count:cut])
+                self._store_summary(thread_id, cut, summary)
+            except Exception:
+                logger.warning("History summarization failed; trimming without summary", exc_info=True)
+        return self._with_summary(summary, messages[cut:])
+
+    @staticmethod
+    def _with_summary(summary: str, recent: List[BaseMessage]) -> List[BaseMessage]:
+        """Prefix the recent messages with the summary, if there is one"""
+        if not summary:
+            return recent
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"), *recent]
+
+    def _find_cut(self, messages: List[BaseMessage], budget: int) -> int:
+        """Index of the first message to keep verbatim"""
+        # Reserve room for the summary itself
+        budget -= budget // 8
+        total = 0
+        cut = len(messages)
+        for index in range(len(messages) - 1, -1, -1):
+            total += count_message_tokens(messages[index])
+            if total > budget:
+                break
+            # Only cut on turn boundaries so tool calls keep their results
+            if isinstance(messages[index], HumanMessage):
+                cut = index
+        else:
+            return 0
+
+        if cut == len(messages):
+            # The latest turn alone exceeds the budget; keep it from its last user message
+            cut = next(
+                (i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)),
+                0,
+            )
+        return cut
+
+    def _cached_summary(self, thread_id: Optional[str], messages: List[BaseMessage], cut: int) -> _ThreadSummary:
+        """Get the thread's cached summary, if it's still valid for this history"""
+        with self._lock:
+            cached = self._summaries.get(thread_id) if thread_id else None
+            if cached:
+                self._summaries.move_to_end(thread_id)
+
+        # A shorter history means the thread was reset; start over
+        if cached is None or cached.folded_count > cut or cached.folded_count > len(messages):
+            return _ThreadSummary(folded_count=0, text="")
+        return cached
+
+    def _store_summary(self, thread_id: Optional[str], folded_count: int, text: str):
+        """Cache a thread's summary, evicting the least recently used threads"""
+        if not thread_id:
+            return
+        with self._lock:
+            self._summaries[thread_id] = _ThreadSummary(folded_count=folded_count, text=text)
+            self._summaries.move_to_end(thread_id)
+            while len(self._summaries) > self.max_threads:
+                self._summaries.popitem(last=False)
+
+    def _summary_prompt(self, summary: str, new_messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """Build the prompt asking the model to extend a summary"""
+        lines = []
+        for message in new_messages:
+            text = message_text(message)
+            if isinstance(message, ToolMessage):
+                text = text[:TOOL_OUTPUT_SUMMARY_CHARS]
+            if text:
+                lines.append(f"{message.type}: {text}")
+        prompt = SUMMARY_PROMPT.format(
+            max_words=max(self.budget // 8 * 3 // 4, 50),
+            summary=summary or "(none)",
+            transcript="\n".join(lines),
+        )
+        return [HumanMessage(content=prompt)]
+
+    def _extend_summary(self, summary: str, new_messages: Sequence[BaseMessage]) -> str:
+        """Ask the model to extend a summary with new messages"""
+        # Tagged nostream so summary tokens never reach the chat placeholder
+        response = self.model.invoke(self._summary_prompt(summary, new_messages), {"tags": [TAG_NOSTREAM]})
+        return message_text(response).strip()
+
+    async def _aextend_summary(self, summary: str, new_messages: Sequence[BaseMessage]) -> str:
+        """Async version of _extend_summary"""
+        response = await self.model.ainvoke(self._summary_prompt(summary, new_messages), {"tags": [TAG_NOSTREAM]})
+        return message_text(response).strip()
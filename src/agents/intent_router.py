@@ -0,0 +1,158 @@
+import importlib
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, NamedTuple
+from config.performance_config import PERFORMANCE_CONFIG
+
+# Values of the "route" state key set by the intent node
+DIRECT, TOOLS = "direct", "tools"
+
+class RouteDecision(NamedTuple):
+    needs_tools: bool
+    reason: str
+
+# Whole messages that are conversation, not questions about the world.
+# Bare affirmatives ("yes", "ok", "sure") are left out: they usually accept
+# something the agent offered, like a lookup, which needs the tools
+_SMALL_TALK = re.compile(
+    r"^(?:(?:hi|hello|hey|hiya|howdy|yo|greetings|good (?:morning|afternoon|evening|night))(?: there| all| everyone)?"
+    r"|thanks?(?: you)?(?: (?:so|very) much)?|thx|ty|cheers|much appreciated"
+    r"|cool|nice|great|awesome|got it|makes sense|i see"
+    r"|no|nope|lol|haha|wow"
+    r"|bye|goodbye|see you(?: later)?|see ya|cya|later|good night"
+    r"|how are you(?: doing)?(?: today)?|how's it going|what's up|sup"
+    r"|who are you|what are you|what can you do|what's your name|what is your name|help)"
+    r"(?: (?:theo|coach|bot|buddy|man|dude|friend|mate|pal))?$"
+)
+# Requests about the conversation so far, answerable from the history alone
+_ABOUT_CONVERSATION = re.compile(
+    r"^(?:can you |could you |please )*"
+    r"(?:summari[sz]e|rephrase|reword|rewrite|simplify|shorten|expand on|explain|translate|repeat)"
+    r" (?:that|this|it|your (?:last )?(?:answer|response|reply)|what you (?:just )?said|our (?:chat|conversation))\b"
+)
+# Signs the answer depends on fresh or looked-up information
+_NEEDS_LOOKUP = re.compile(
+    r"\b(?:search|look ?up|google|find|latest|recent|news|today|tonight|yesterday|tomorrow|this (?:week|year|season)"
+    r"|current(?:ly)?|right now|price|score|stats?|standings|weather|who won|schedule|rules?|spell|according to"
+    r"|https?://|www\.|\d{4})\b"
+)
+
+class HeuristicIntentRouter:
+    """
+    Keyword rules for whether a message could need tools.
+
+    Deliberately conservative: only greetings, thanks, acknowledgements and
+    requests to rework the previous answer skip tools, and route_message
+    sends any reply to a question from the agent down the full path.
+    Anything else, and anything mentioning a lookup or fresh information,
+    takes the full path.
+    """
+
+    def classify(self, text: str) -> RouteDecision:
+        normalized = re.sub(r"[^\w\s':/.-]", " ", text.lower())
+        normalized = re.sub(r"\s+", " ", normalized).strip(" .")
+        if _NEEDS_LOOKUP.search(normalized):
+            return RouteDecision(True, "lookup keyword")
+        if not normalized or _SMALL_TALK.match(normalized):
+            return RouteDecision(False, "small talk")
+        if _ABOUT_CONVERSATION.match(normalized):
+            return RouteDecision(False, "about the conversation")
+        return RouteDecision(True, "default")
+
+# Built-in routers; INTENT_ROUTER may also name a "module:factory" returning
+# an object with classify(text) -> RouteDecision, e.g. a small local model
+INTENT_ROUTERS = {
+    "heuristic": "agents.intent_router:HeuristicIntentRouter",
+}
+
+_routers: Dict[str, Any] = {}
+_routers_lock = threading.Lock()
+
+def get_intent_router(name: str = None):
+    """The configured pre-router, or None when it's off"""
+    name = PERFORMANCE_CONFIG.intent_router if name is None else name
+    if not name or name == "off":
+        return None
+    with _routers_lock:
+        if name not in _routers:
+            path = INTENT_ROUTERS.get(name, name)
+            if ":" not in path:
+                raise ValueError(f"Unknown intent router: {name}")
+            module_name, factory_name = path.split(":")
+            _routers[name] = getattr(importlib.import_module(module_name), factory_name)()
+        return _routers[name]
+
+# How much of the previous reply's tail to check for a question or offer
+_FOLLOW_UP_TAIL = 200
+
+def _answers_question(messages) -> bool:
+    """Whether the assistant's previous reply ended by asking or offering something"""
+    previous = next((message for message in reversed(messages[:-1]) if message.type == "ai"), None)
+    return previous is not None and "?" in str(previous.content)[-_FOLLOW_UP_TAIL:]
+
+def route_message(router, messages, has_tools: bool) -> Dict[str, str]:
+    """State update for the intent node: where the latest message should go"""
+    if not has_tools:
+        return {"route": DIRECT}
+    # The classifier only sees the new message, so even a bare "no" or
+    # "thanks" in reply to "Want me to look that up?" keeps the full path
+    if _answers_question(messages):
+        return {"route": TOOLS}
+    decision = router.classify(str(messages[-1].content))
+    return {"route": TOOLS if decision.needs_tools else DIRECT}
+
+class RoutingStats:
+    """
+    Trace sink tallying turns, model calls and latency per route.
+
+    A full-path turn that ended up calling no tools is counted as "unused":
+    the pre-router could have sent it down the direct path. Together with
+    labelled runs of benchmarks.evaluate, that shows how often routing is
+    right and what each route costs.
+    """
+
+    def __init__(self):
+        self._totals: Dict[tuple, Dict[str, float]] = defaultdict(
+            lambda: {"turns": 0, "llm_calls": 0, "tool_calls": 0, "seconds": 0.0, "unused": 0}
+        )
+        self._lock = threading.Lock()
+
+    def emit(self, trace):
+        if trace.route is None:
+            return
+        llm_calls = sum(1 for span in trace.spans if span.kind == "llm")
+        tool_calls = sum(1 for span in trace.spans if span.kind == "tool")
+        with self._lock:
+            totals = self._totals[(trace.agent_type, trace.route)]
+            totals["turns"] += 1
+            totals["llm_calls"] += llm_calls
+            totals["tool_calls"] += tool_calls
+            totals["seconds"] += trace.duration
+            if trace.route == TOOLS and not tool_calls:
+                totals["unused"] += 1
+
+    def summary(self, agent_type: str = None) -> Dict[str, Dict[str, float]]:
+        """Per-route turn counts and mean model calls and latency"""
+        with self._lock:
+            items = [(key, dict(totals)) for key, totals in self._totals.items()]
+        routes: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for (trace_agent_type, route), totals in items:
+            if agent_type is None or trace_agent_type == agent_type:
+                for name, value in totals.items():
+                    routes[route][name] += value
+        return {
+            route: {
+                "turns": int(totals["turns"]),
+                "mean_llm_calls": totals["llm_calls"] / totals["turns"],
+                "mean_ms": totals["seconds"] * 1000 / totals["turns"],
+                "unused": int(totals["unused"]),
+            }
+            for route, totals in routes.items()
+        }
+
+_routing_stats = RoutingStats()
+
+def get_routing_stats() -> RoutingStats:
+    """Get the process-wide routing tallies"""
+    return _routing_stats
@@ -1,10 +1,12 @@
 from .base_agent import BaseAgent
 from langchain.schema import SystemMessage
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, List, Union
+from langgraph.graph.message import add_messages
+from langchain_core.messages import BaseMessage
+from typing import TypedDict, Sequence, Annotated
 
 class AgentState(TypedDict):
-    messages: List[Union[SystemMessage]]
+    messages: Annotated[Sequence[BaseMessage], add_messages]
 
 class PlainAgent(BaseAgent):
     """
@@ -23,14 +25,21 @@ class PlainAgent(BaseAgent):
         def call_model(state: AgentState, config: dict):
             """Node for calling the model"""
             system_msg = SystemMessage(content=self.config.system_prompt)
-            response = model.invoke([system_msg] + state["messages"], config)
+            response = model.invoke(self._build_prompt(system_msg, state["messages"], config), config)
+            return {"messages": [response]}
+
+        async def acall_model(state: AgentState, config: dict):
+            """Async node for calling the model"""
+            system_msg = SystemMessage(content=self.config.system_prompt)
+            prompt = await self._abuild_prompt(system_msg, state["messages"], config)
+            response = await model.ainvoke(prompt, config)
             return {"messages": [response]}
 
         # Create and compile the graph
         workflow = StateGraph(AgentState)
         
         # Add single node
-        workflow.add_node("agent", call_model)
+        self._add_node(workflow, "agent", call_model, acall_model)
         
         # Set entry point
         workflow.set_entry_point("agent")
@@ -38,4 +47,4 @@ class PlainAgent(BaseAgent):
         # Add edge to end
         workflow.add_edge("agent", END)
         
-        return workflow.compile() 
\ No newline at end of file
+        return workflow.compile(checkpointer=self.memory) 
\ No newline at end of file
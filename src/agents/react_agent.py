@@ -1,14 +1,15 @@
 from typing import Sequence, TypedDict, Annotated
-from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
+from langchain_core.messages import BaseMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langchain_core.runnables import RunnableConfig
 from .base_agent import BaseAgent
-import json
+from tools.tool_executor import aexecute_tool_calls, execute_tool_calls
 
 class AgentState(TypedDict):
     """The state of the agent."""
     messages: Annotated[Sequence[BaseMessage], add_messages]
+    route: str
 
 class ReactAgent(BaseAgent):
     """
@@ -30,26 +31,43 @@ class ReactAgent(BaseAgent):
         tools_by_name = {tool.name: tool for tool in tools}
         
         # Bind tools to model
-        model = self.get_model().bind_tools(tools)
+        plain_model = self.get_model()
+        model = plain_model.bind_tools(tools)
         
-        def tool_node(state: AgentState):
+        def tool_node(state: AgentState, config: RunnableConfig):
             """Node for executing tools"""
-            outputs = []
-            for tool_call in state["messages"][-1].tool_calls:
-                tool_result = tools_by_name[tool_call["name"]].invoke(tool_call["args"])
-                outputs.append(
-                    ToolMessage(
-                        content=json.dumps(tool_result),
-                        name=tool_call["name"],
-                        tool_call_id=tool_call["id"],
-                    )
-                )
+            outputs = execute_tool_calls(state["messages"][-1].tool_calls, tools_by_name, config)
+            return {"messages": outputs}
+
+        async def atool_node(state: AgentState, config: RunnableConfig):
+            """Async node for executing tools"""
+            outputs = await aexecute_tool_calls(state["messages"][-1].tool_calls, tools_by_name, config)
             return {"messages": outputs}
 
         def call_model(state: AgentState, config: RunnableConfig):
             """Node for calling the model"""
             system_msg = SystemMessage(content=self.config.system_prompt)
-            response = model.invoke([system_msg] + state["messages"], config)
+            response = model.invoke(self._build_prompt(system_msg, state["messages"], config), config)
+            return {"messages": [response]}
+
+        async def acall_model(state: AgentState, config: RunnableConfig):
+            """Async node for calling the model"""
+            system_msg = SystemMessage(content=self.config.system_prompt)
+            prompt = await self._abuild_prompt(system_msg, state["messages"], config)
+            response = await model.ainvoke(prompt, config)
+            return {"messages": [response]}
+
+        def call_direct(state: AgentState, config: RunnableConfig):
+            """Node answering a message that needs no tools in one call"""
+            system_msg = SystemMessage(content=self.config.system_prompt)
+            response = plain_model.invoke(self._build_prompt(system_msg, state["messages"], config), config)
+            return {"messages": [response]}
+
+        async def acall_direct(state: AgentState, config: RunnableConfig):
+            """Async node answering a message that needs no tools in one call"""
+            system_msg = SystemMessage(content=self.config.system_prompt)
+            prompt = await self._abuild_prompt(system_msg, state["messages"], config)
+            response = await plain_model.ainvoke(prompt, config)
             return {"messages": [response]}
 
         def should_continue(state: AgentState):
@@ -63,11 +81,11 @@ class ReactAgent(BaseAgent):
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("agent", call_model)
-        workflow.add_node("tools", tool_node)
+        self._add_node(workflow, "agent", call_model, acall_model)
+        self._add_node(workflow, "tools", tool_node, atool_node)
         
         # Set entry point
-        workflow.set_entry_point("agent")
+        self._set_entry(workflow, tools, "agent", "direct", (call_direct, acall_direct))
         
         # Add edges
         workflow.add_conditional_edges(
@@ -80,4 +98,4 @@ class ReactAgent(BaseAgent):
         )
         workflow.add_edge("tools", "agent")
         
-        return workflow.compile() 
\ No newline at end of file
+        return workflow.compile(checkpointer=self.memory) 
\ No newline at end of file
@@ -0,0 +1,79 @@
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from utils.tokens import message_text
+
+@dataclass
+class StreamEvent:
+    """A single event emitted while an agent graph runs"""
+    kind: str  # "token", "tool_call", "tool_result", "notice" or "final"
+    content: str = ""
+    name: Optional[str] = None
+    state: Dict[str, Any] = field(default_factory=dict)
+    trace: Any = None  # TurnTrace on the final event, when the run was traced
+    result: Any = None  # TurnResult on the final event of a chat service turn
+
+STREAM_MODES = ["messages", "updates", "values"]
+
+def _update_events(update: Dict[str, Any]) -> Iterator[StreamEvent]:
+    """Turn a node's state update into tool progress events"""
+    for node_update in update.values():
+        if not isinstance(node_update, dict):
+            continue
+        for message in node_update.get("messages", []):
+            if isinstance(message, AIMessage):
+                for tool_call in message.tool_calls:
+                    yield StreamEvent(
+                        kind="tool_call",
+                        name=tool_call["name"],
+                        content=str(tool_call["args"]),
+                    )
+            elif isinstance(message, ToolMessage):
+                yield StreamEvent(
+                    kind="tool_result",
+                    name=message.name,
+                    content=message_text(message),
+                )
+
+def _translate(mode: str, chunk: Any, response_nodes: Sequence[str]) -> Iterator[StreamEvent]:
+    """Translate one LangGraph stream item into StreamEvents"""
+    if mode == "messages":
+        message, metadata = chunk
+        if (
+            isinstance(message, AIMessageChunk)
+            and metadata.get("langgraph_node") in response_nodes
+        ):
+            text = message_text(message)
+            if text:
+                yield StreamEvent(kind="token", content=text)
+    elif mode == "updates":
+        yield from _update_events(chunk)
+
+def stream_agent_events(graph, inputs: Dict[str, Any], config: Dict[str, Any],
+                        response_nodes: Sequence[str]) -> Iterator[StreamEvent]:
+    """
+    Run a compiled agent graph and yield events as they happen.
+
+    Tokens are only emitted for the nodes in response_nodes, so routing
+    calls don't leak into the visible answer. The last event is always
+    "final" and carries the graph's final state.
+    """
+    final_state: Dict[str, Any] = {}
+    for mode, chunk in graph.stream(inputs, config=config, stream_mode=STREAM_MODES):
+        if mode == "values":
+            final_state = chunk
+            continue
+        yield from _translate(mode, chunk, response_nodes)
+    yield StreamEvent(kind="final", state=final_state)
+
+async def astream_agent_events(graph, inputs: Dict[str, Any], config: Dict[str, Any],
+                               response_nodes: Sequence[str]) -> AsyncIterator[StreamEvent]:
+    """Async version of stream_agent_events"""
+    final_state: Dict[str, Any] = {}
+    async for mode, chunk in graph.astream(inputs, config=config, stream_mode=STREAM_MODES):
+        if mode == "values":
+            final_state = chunk
+            continue
+        for event in _translate(mode, chunk, response_nodes):
+            yield event
+    yield StreamEvent(kind="final", state=final_state)
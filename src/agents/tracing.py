@@ -0,0 +1,391 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from config.performance_config import PERFORMANCE_CONFIG
+from utils.tokens import count_messages_tokens, count_tokens
+
+@dataclass
+class Span:
+    """One timed unit of work within a turn"""
+    kind: str  # "node", "llm" or "tool"
+    name: str
+    node: Optional[str]  # graph node the work ran under
+    start: float
+    duration: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_estimated: bool = False
+    input_bytes: int = 0
+    output_bytes: int = 0
+    error: Optional[str] = None
+    model: Optional[str] = None  # model id, for model calls
+
+@dataclass
+class TurnTrace:
+    """All spans recorded for one agent turn"""
+    trace_id: str
+    thread_id: Optional[str]
+    agent_type: str
+    model: str
+    started_at: float
+    agent: str = ""
+    user: Optional[str] = None
+    duration: float = 0.0
+    spans: List[Span] = field(default_factory=list)
+    route: Optional[str] = None  # intent router's choice, when it ran
+
+    @property
+    def iterations(self) -> Dict[str, int]:
+        """How many times each graph node ran in this turn"""
+        counts: Dict[str, int] = defaultdict(int)
+        for span in self.spans:
+            if span.kind == "node":
+                counts[span.name] += 1
+        return dict(counts)
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """Per-node and per-tool totals, in the order they first ran"""
+        rows: Dict[tuple, Dict[str, Any]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            if span.kind == "llm":
+                continue
+            row = rows.setdefault((span.kind, span.name), {
+                "step": span.name if span.kind == "node" else f"{span.name} (tool)",
+                "calls": 0, "ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "payload_bytes": 0,
+            })
+            row["calls"] += 1
+            row["ms"] += span.duration * 1000
+            row["payload_bytes"] += span.output_bytes
+        for span in self.spans:
+            if span.kind == "llm" and ("node", span.node) in rows:
+                row = rows[("node", span.node)]
+                row["prompt_tokens"] += span.prompt_tokens
+                row["completion_tokens"] += span.completion_tokens
+        for row in rows.values():
+            row["ms"] = round(row["ms"], 1)
+        return list(rows.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["iterations"] = self.iterations
+        return data
+
+class TraceCollector(BaseCallbackHandler):
+    """
+    Callback handler that times graph nodes, model calls and tools.
+
+    LangGraph tags each node run with langgraph_node metadata, which is how
+    model and tool runs are attributed to the node they ran under. Token
+    counts come from the model's usage metadata (LiteLLM reports it), and
+    fall back to local counts when a provider omits it.
+    """
+
+    run_inline = True
+
+    def __init__(self, trace: TurnTrace):
+        self.trace = trace
+        self.started = time.perf_counter()
+        self._open: Dict[uuid.UUID, Span] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: uuid.UUID, span: Span):
+        with self._lock:
+            self._open[run_id] = span
+
+    def _end(self, run_id: uuid.UUID, **updates) -> Optional[Span]:
+        with self._lock:
+            span = self._open.pop(run_id, None)
+            if span is None:
+                return None
+            span.duration = time.perf_counter() - span.start
+            for key, value in updates.items():
+                setattr(span, key, value)
+            self.trace.spans.append(span)
+            return span
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None,
+                       name=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the node's own run: skip LangGraph internals and the same-named
+        # runnable nested inside the node
+        if node is None or name != node or node.startswith("__"):
+            return
+        with self._lock:
+            parent = self._open.get(parent_run_id)
+        if parent is None or parent.kind != "node":
+            self._start(run_id, Span(kind="node", name=node, node=node, start=time.perf_counter()))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        span = self._end(run_id)
+        if span is not None and isinstance(outputs, dict) and "route" in outputs:
+            self.trace.route = outputs["route"]
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=str(error))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, name=None, **kwargs):
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or kwargs.get("invocation_params", {}).get("model")
+        span = Span(
+            kind="llm",
+            name=name or "model",
+            node=metadata.get("langgraph_node"),
+            model=model.split("/", 1)[-1] if model else None,
+            start=time.perf_counter(),
+            prompt_tokens=count_messages_tokens(messages[0]) if messages else 0,
+            tokens_estimated=True,
+        )
+        self._start(run_id, span)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            self._end(run_id, prompt_tokens=usage.get("input_tokens", 0),
+                      completion_tokens=usage.get("output_tokens", 0), tokens_estimated=False)
+        else:
+            self._end(run_id, completion_tokens=count_tokens(generation.text) if generation else 0)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=str(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, name=None, **kwargs):
+        span = Span(
+            kind="tool",
+            name=name or (serialized or {}).get("name", "tool"),
+            node=(metadata or {}).get("langgraph_node"),
+            start=time.perf_counter(),
+            input_bytes=len(str(input_str).encode("utf-8")),
+        )
+        self._start(run_id, span)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        content = getattr(output, "content", output)
+        text = content if isinstance(content, str) else json.dumps(content, default=str)
+        self._end(run_id, output_bytes=len(text.encode("utf-8")))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=str(error))
+
+class RingBufferSink:
+    """Keeps the most recent traces in memory"""
+
+    def __init__(self, capacity: int):
+        self._traces = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def emit(self, trace: TurnTrace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit: int = None) -> List[TurnTrace]:
+        with self._lock:
+            traces = list(self._traces)
+        return traces[-limit:] if limit else traces
+
+class JsonlSink:
+    """
+    Appends each trace as one JSON line.
+
+    emit only serializes and buffers the line, since it runs on the turn's
+    event loop; a background thread appends buffered lines every
+    flush_interval seconds, or emit writes at once if it's 0.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._closed = threading.Event()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if flush_interval > 0:
+            threading.Thread(target=self._flush_periodically, name="trace-flush", daemon=True).start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def emit(self, trace: TurnTrace):
+        line = json.dumps(trace.to_dict())
+        with self._lock:
+            self._pending.append(line)
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def flush(self):
+        """Append buffered lines to the file"""
+        with self._lock:
+            lines, self._pending = self._pending, []
+            if lines:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(line + "\n" for line in lines))
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+
+class PrometheusSink:
+    """
+    Aggregates traces into counters exposed in the Prometheus text format.
+
+    Durations are exported as summary-style _sum/_count pairs, which is
+    enough for rate and average queries without client-side buckets.
+    """
+
+    def __init__(self):
+        self._values: Dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _add(self, metric: str, labels: Dict[str, str], value: float):
+        self._values[(metric, tuple(sorted(labels.items())))] += value
+
+    def emit(self, trace: TurnTrace):
+        agent = {"agent_type": trace.agent_type}
+        with self._lock:
+            self._add("gpfree_turn_duration_seconds_sum", agent, trace.duration)
+            self._add("gpfree_turn_duration_seconds_count", agent, 1)
+            if trace.route is not None:
+                self._add("gpfree_route_total", {**agent, "route": trace.route}, 1)
+            for span in trace.spans:
+                if span.kind == "node":
+                    labels = {**agent, "node": span.name}
+                    self._add("gpfree_node_duration_seconds_sum", labels, span.duration)
+                    self._add("gpfree_node_duration_seconds_count", labels, 1)
+                elif span.kind == "llm":
+                    labels = {**agent, "node": span.node or ""}
+                    self._add("gpfree_llm_duration_seconds_sum", labels, span.duration)
+                    self._add("gpfree_llm_duration_seconds_count", labels, 1)
+                    self._add("gpfree_llm_tokens_total", {**labels, "type": "prompt"}, span.prompt_tokens)
+                    self._add("gpfree_llm_tokens_total", {**labels, "type": "completion"}, span.completion_tokens)
+                else:
+                    labels = {"tool": span.name}
+                    self._add("gpfree_tool_duration_seconds_sum", labels, span.duration)
+                    self._add("gpfree_tool_duration_seconds_count", labels, 1)
+                    self._add("gpfree_tool_payload_bytes_total", {**labels, "direction": "in"}, span.input_bytes)
+                    self._add("gpfree_tool_payload_bytes_total", {**labels, "direction": "out"}, span.output_bytes)
+                if span.error:
+                    self._add("gpfree_errors_total", {"kind": span.kind, "name": span.name}, 1)
+
+    def render(self) -> str:
+        """Current values in the Prometheus text exposition format"""
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = []
+        for (metric, labels), value in items:
+            label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+            lines.append(f"{metric}{{{label_text}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int):
+        """Serve /metrics on a daemon thread"""
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+
+class Tracer:
+    """Creates per-turn collectors and fans finished traces out to sinks"""
+
+    def __init__(self, sinks: List[Any]):
+        self.sinks = sinks
+
+    def start_turn(self, config: Dict[str, Any], agent_config) -> TraceCollector:
+        """Begin tracing a turn run with the given graph config"""
+        trace = TurnTrace(
+            trace_id=uuid.uuid4().hex,
+            thread_id=config.get("configurable", {}).get("thread_id"),
+            agent_type=agent_config.agent_type,
+            model=agent_config.model_id,
+            started_at=time.time(),
+            agent=agent_config.name,
+            user=config.get("metadata", {}).get("user"),
+        )
+        return TraceCollector(trace)
+
+    def finish(self, collector: TraceCollector) -> TurnTrace:
+        """Close a turn's trace and send it to every sink"""
+        trace = collector.trace
+        trace.duration = time.perf_counter() - collector.started
+        for sink in self.sinks:
+            sink.emit(trace)
+        return trace
+
+    def sink(self, sink_type: type):
+        """The first configured sink of a type, if any"""
+        return next((sink for sink in self.sinks if isinstance(sink, sink_type)), None)
+
+def with_callback(config: Dict[str, Any], handler: BaseCallbackHandler) -> Dict[str, Any]:
+    """Copy of a graph config with an extra callback handler"""
+    callbacks = config.get("callbacks")
+    if callbacks is None:
+        callbacks = [handler]
+    elif isinstance(callbacks, list):
+        callbacks = callbacks + [handler]
+    else:
+        callbacks = callbacks.copy()
+        callbacks.add_handler(handler, inherit=True)
+    return {**config, "callbacks": callbacks}
+
+def create_sinks(names: str) -> List[Any]:
+    """Build sinks from a comma-separated list of names"""
+    sinks = []
+    for name in filter(None, (part.strip() for part in names.split(","))):
+        if name == "memory":
+            sinks.append(RingBufferSink(PERFORMANCE_CONFIG.trace_buffer_size))
+        elif name == "jsonl":
+            sink = JsonlSink(PERFORMANCE_CONFIG.trace_jsonl_path, PERFORMANCE_CONFIG.trace_flush_interval)
+            # Don't lose the last unwritten traces on shutdown
+            atexit.register(sink.flush)
+            sinks.append(sink)
+        elif name == "prometheus":
+            sink = PrometheusSink()
+            if PERFORMANCE_CONFIG.trace_prometheus_port:
+                sink.serve(PERFORMANCE_CONFIG.trace_prometheus_port)
+            sinks.append(sink)
+        else:
+            raise ValueError(f"Unknown trace sink: {name}")
+    return sinks
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            sinks = create_sinks(PERFORMANCE_CONFIG.trace_sinks)
+            if PERFORMANCE_CONFIG.usage_db_path:
+                # Cost accounting rides on the same traces
+                from utils.cost_ledger import get_cost_ledger
+                sinks.append(get_cost_ledger())
+            if PERFORMANCE_CONFIG.intent_router not in ("", "off"):
+                from agents.intent_router import get_routing_stats
+                sinks.append(get_routing_stats())
+            _tracer = Tracer(sinks)
+        return _tracer
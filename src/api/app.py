@@ -0,0 +1,226 @@
+"""
+Headless HTTP API for the agents.
+
+Serves the same agent configs, shared compiled graphs, stored threads and
+messages as the Streamlit UI, without a script rerun per interaction.
+Responses can be streamed as server-sent events.
+
+Run from src/:
+    uvicorn api.app:app --workers 1 --port 8000
+"""
+import asyncio
+import base64
+import dataclasses
+import json
+import secrets
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import AIMessage, HumanMessage
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from agents.streaming import StreamEvent
+from auth.auth import USERS
+from config.agent_config import DEFAULT_AGENTS, AgentConfig
+from config.performance_config import PERFORMANCE_CONFIG
+from services.chat_service import ChatService, TurnRequest, chat_service
+from utils.storage import SqliteStorage, Storage, get_storage
+
+_local_threads = None
+_local_threads_lock = threading.Lock()
+
+def get_thread_store() -> Storage:
+    """Where API threads are registered: shared storage, or this process's memory if that's disabled"""
+    global _local_threads
+    storage = get_storage()
+    if storage is not None:
+        return storage
+    with _local_threads_lock:
+        if _local_threads is None:
+            _local_threads = SqliteStorage(":memory:", flush_interval=0)
+        return _local_threads
+
+def get_agents(user: str) -> Dict[str, AgentConfig]:
+    """Agent configs offered to a user: the defaults plus their own"""
+    storage = get_storage()
+    return {**DEFAULT_AGENTS, **(storage.get_agents(user) if storage is not None else {})}
+
+def authenticate(request: Request) -> Optional[str]:
+    """Username from HTTP basic credentials, checked against the app's users"""
+    header = request.headers.get("authorization", "")
+    if not header.lower().startswith("basic "):
+        return None
+    try:
+        username, _, password = base64.b64decode(header[6:]).decode("utf-8").partition(":")
+    except ValueError:
+        return None
+    expected = USERS.get(username)
+    if expected is None or not secrets.compare_digest(expected, password):
+        return None
+    return username
+
+def error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status)
+
+async def read_json(request: Request) -> Optional[Dict[str, Any]]:
+    """Request body as a JSON object, or None if it isn't one"""
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+def requires_user(handler):
+    """Reject requests without valid credentials"""
+    async def wrapper(request: Request):
+        user = authenticate(request)
+        if user is None:
+            return JSONResponse({"error": "unauthorized"}, status_code=401,
+                                headers={"WWW-Authenticate": 'Basic realm="gpfree"'})
+        request.state.user = user
+        return await handler(request)
+    return wrapper
+
+def agent_summary(key: str, agent_config: AgentConfig) -> Dict[str, Any]:
+    return {
+        "agent": key,  # what POST /threads expects
+        "name": agent_config.name,
+        "agent_type": agent_config.agent_type,
+        "model_id": agent_config.model_id,
+        "icon": agent_config.icon,
+        "tools": agent_config.tools or [],
+    }
+
+def message_dict(message) -> Optional[Dict[str, str]]:
+    """Chat view of a checkpointed message; tool traffic is left out"""
+    if isinstance(message, HumanMessage):
+        return {"role": "user", "content": message.content}
+    if isinstance(message, AIMessage) and message.content and not message.tool_calls:
+        return {"role": "assistant", "content": message.content}
+    return None
+
+def event_dict(event: StreamEvent) -> Dict[str, Any]:
+    """JSON payload for a stream event"""
+    if event.kind == "final":
+        return dataclasses.asdict(event.result)
+    if event.kind == "tool_result":
+        return {"name": event.name, "size": len(event.content)}
+    return {"name": event.name, "content": event.content}
+
+async def health(request: Request):
+    return JSONResponse({"status": "ok"})
+
+@requires_user
+async def list_agents(request: Request):
+    agents = await asyncio.to_thread(get_agents, request.state.user)
+    return JSONResponse({"agents": [agent_summary(key, config) for key, config in agents.items()]})
+
+@requires_user
+async def create_thread(request: Request):
+    body = await read_json(request)
+    if body is None:
+        return error(400, "expected a JSON object")
+    agent = body.get("agent")
+    if agent not in await asyncio.to_thread(get_agents, request.state.user):
+        return error(404, f"unknown agent: {agent}")
+    thread = await asyncio.to_thread(get_thread_store().create_thread, request.state.user, agent, uuid.uuid4().hex)
+    return JSONResponse(thread, status_code=201)
+
+@requires_user
+async def list_threads(request: Request):
+    threads = await asyncio.to_thread(get_thread_store().list_threads, request.state.user,
+                                      request.query_params.get("agent"))
+    return JSONResponse({"threads": threads})
+
+async def find_thread(request: Request) -> Optional[Dict[str, Any]]:
+    """The thread named in the path, if it belongs to the requesting user"""
+    thread = await asyncio.to_thread(get_thread_store().get_thread, request.path_params["thread_id"])
+    return thread if thread and thread["user"] == request.state.user else None
+
+async def thread_history(service: ChatService, thread: Dict[str, Any], agent_config: AgentConfig,
+                         limit: int, before: int = None) -> List[Dict[str, Any]]:
+    """A page of a thread's messages, oldest first"""
+    storage = get_storage()
+    if storage is not None:
+        messages = await asyncio.to_thread(storage.get_messages, thread["thread_id"], limit, before)
+        return [message._asdict() for message in messages]
+    # Without storage the checkpoint is the only record of the conversation
+    agent_instance, graph = service.agents.get(agent_config)
+    state = await graph.aget_state({"configurable": {"thread_id": thread["thread_id"]}})
+    messages = [entry for entry in map(message_dict, (state.values or {}).get("messages", [])) if entry]
+    return messages[-limit:]
+
+@requires_user
+async def get_messages(request: Request):
+    thread = await find_thread(request)
+    if thread is None:
+        return error(404, "unknown thread")
+    agents = await asyncio.to_thread(get_agents, request.state.user)
+    if thread["agent"] not in agents:
+        return error(404, f"unknown agent: {thread['agent']}")
+    try:
+        limit = int(request.query_params.get("limit", PERFORMANCE_CONFIG.session_page_size))
+        before = request.query_params.get("before")
+        before = int(before) if before else None
+    except ValueError:
+        return error(400, "limit and before must be integers")
+    limit = max(1, min(limit, PERFORMANCE_CONFIG.session_page_size))
+    if before is not None and get_storage() is None:
+        # Checkpoint messages have no ids to page by
+        return error(400, "before requires message storage")
+    messages = await thread_history(chat_service, thread, agents[thread["agent"]], limit, before)
+    return JSONResponse({"messages": messages})
+
+@requires_user
+async def post_message(request: Request):
+    thread = await find_thread(request)
+    if thread is None:
+        return error(404, "unknown thread")
+    body = await read_json(request)
+    if body is None:
+        return error(400, "expected a JSON object")
+    content = body.get("content")
+    if not isinstance(content, str) or not content.strip():
+        return error(400, "content is required")
+    agents = await asyncio.to_thread(get_agents, request.state.user)
+    if thread["agent"] not in agents:
+        return error(404, f"unknown agent: {thread['agent']}")
+
+    agent_config = agents[thread["agent"]]
+    # Only the response cache needs earlier turns, to scope its keys
+    history = []
+    if agent_config.cache_responses:
+        turns = PERFORMANCE_CONFIG.response_cache_context_turns
+        history = await thread_history(chat_service, thread, agent_config, 2 * turns) if turns > 0 else []
+    turn = TurnRequest(
+        user=request.state.user,
+        agent_config=agent_config,
+        thread_id=thread["thread_id"],
+        prompt=content,
+        history=history,
+    )
+
+    if body.get("stream") or "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(sse_events(turn), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    result = await chat_service.arun_turn(turn)
+    return JSONResponse(dataclasses.asdict(result))
+
+async def sse_events(turn: TurnRequest):
+    """Format a turn's events as server-sent events"""
+    try:
+        async for event in chat_service.astream_turn(turn):
+            yield f"event: {event.kind}\ndata: {json.dumps(event_dict(event))}\n\n"
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'error': f'{type(e).__name__}: {e}'})}\n\n"
+
+app = Starlette(routes=[
+    Route("/health", health),
+    Route("/agents", list_agents),
+    Route("/threads", list_threads, methods=["GET"]),
+    Route("/threads", create_thread, methods=["POST"]),
+    Route("/threads/{thread_id}/messages", get_messages, methods=["GET"]),
+    Route("/threads/{thread_id}/messages", post_message, methods=["POST"]),
+])
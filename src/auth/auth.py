@@ -1,5 +1,6 @@
 import streamlit as st
 from typing import Dict, Optional
+from utils.storage import get_storage
 
 # Simulated user database (in memory)
 USERS = {
@@ -20,21 +21,18 @@ def init_auth():
         st.session_state.authenticated = False
     if 'username' not in st.session_state:
         st.session_state.username = None
-    if 'user_data' not in st.session_state:
-        st.session_state.user_data = {}
 
 def login(username: str, password: str) -> bool:
     """Simple login function"""
     if username in USERS and USERS[username] == password:
         st.session_state.authenticated = True
         st.session_state.username = username
-        # Initialize user data if first login
-        if username not in st.session_state.user_data:
-            st.session_state.user_data[username] = {
-                "sessions": {},
-                "current_session": None,
-                "user_agents": {}
-            }
+        # Reload the user's agents and chats from storage
+        st.session_state.pop("user_agents", None)
+        st.session_state.pop("session_store", None)
+        storage = get_storage()
+        if storage is not None:
+            storage.touch_user(username)
         return True
     return False
 
@@ -50,6 +48,7 @@ def get_current_user() -> Optional[str]:
 def get_user_data() -> Dict:
     """Get current user's data"""
     username = get_current_user()
-    if username:
-        return st.session_state.user_data[username]
+    storage = get_storage()
+    if username and storage is not None:
+        return storage.get_user(username) or {}
     return {} 
\ No newline at end of file
@@ -0,0 +1,294 @@
+"""
+Batch evaluation: runs a JSONL set of prompts or conversations through an
+agent's compiled graph.
+
+Each input line is {"id": ..., "prompt": "..."} or {"id": ..., "messages":
+["first user message", "follow-up", ...]}; a conversation's messages run
+as consecutive turns in one thread. Results are appended to the output
+JSONL as records finish, one line per record with answers, latency and
+token usage. Records already in the output without an error are skipped,
+so an interrupted run resumes where it stopped.
+
+A record may also carry "needs_tools": true/false (or a list, one per user
+turn) labelling whether answering takes tools; each labelled turn then
+records whether the intent router chose the right route, and the summary
+reports routing accuracy. Compare runs with --intent-router off to measure
+the model calls and latency the fast path saves.
+
+Usage (from src/):
+    python -m benchmarks.evaluate prompts.jsonl --agent "Coach Theo" --output results.jsonl
+    python -m benchmarks.evaluate prompts.jsonl --agent "Coach Theo" --system-prompt-file theo_v2.txt
+    python -m benchmarks.evaluate prompts.jsonl --agent "Quest Craft" --fake
+    python -m benchmarks.evaluate prompts.jsonl --agent "Coach Theo" --intent-router off
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Set
+from agents.fake_model import fake_model_factory
+from agents.graph_cache import GraphCache
+from agents.intent_router import DIRECT, TOOLS
+from config.agent_config import DEFAULT_AGENTS, AgentConfig
+from config.performance_config import PERFORMANCE_CONFIG
+from utils.cost_ledger import CostLedger
+from .fakes import FAKE_TOOL_SETTINGS, FAKE_TOOLS, register_fake_tools
+from .run import latency_stats
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Input records with an id and a list of user turns"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "messages" in record:
+                turns = [m["content"] if isinstance(m, dict) else m for m in record["messages"]
+                         if not isinstance(m, dict) or m.get("role", "user") == "user"]
+            elif "prompt" in record:
+                turns = [record["prompt"]]
+            else:
+                raise ValueError(f"{path}:{line_number}: expected a prompt or messages")
+            labels = record.get("needs_tools")
+            if not isinstance(labels, list):
+                labels = [labels] * len(turns)
+            # Turns past the end of a label list are unlabelled
+            labels = labels[:len(turns)] + [None] * (len(turns) - len(labels))
+            yield {"id": str(record.get("id", line_number)), "turns": turns, "needs_tools": labels}
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids whose latest result in an earlier output file succeeded"""
+    if not os.path.exists(path):
+        return set()
+    latest = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interrupted run
+            latest[result["id"]] = result.get("error") is None
+    return {record_id for record_id, ok in latest.items() if ok}
+
+def is_rate_limit(error: Exception) -> bool:
+    """Whether an error is the provider asking us to slow down"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or "ratelimit" in type(error).__name__.lower() or "rate limit" in str(error).lower()
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's response, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class Pacer:
+    """
+    Shared start gate for all workers: spaces turns to at most rpm per
+    minute and, after a rate-limit error, holds every worker back until the
+    cooldown ends rather than letting the others keep hitting the limit.
+    """
+
+    def __init__(self, rpm: float = 0):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self._next_start = 0.0
+        self._resume_at = 0.0
+
+    async def wait(self):
+        while True:
+            now = time.monotonic()
+            start = max(self._next_start, self._resume_at, now)
+            if start <= now:
+                self._next_start = now + self.interval
+                return
+            await asyncio.sleep(start - now)
+
+    def cool_down(self, seconds: float):
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+class Evaluator:
+    """Runs records through one agent with bounded concurrency and retries"""
+
+    def __init__(self, agent_config: AgentConfig, agents: GraphCache, concurrency: int,
+                 retries: int, backoff: float, pacer: Pacer):
+        self.agent_config = agent_config
+        self.agent_instance, _ = agents.get(agent_config)
+        self.retries = retries
+        self.backoff = backoff
+        self.pacer = pacer
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def run_turn(self, thread_id: str, prompt: str, needs_tools: bool = None) -> Dict[str, Any]:
+        config = {
+            "configurable": {"thread_id": thread_id},
+            "metadata": {"user": "batch-eval", "agent_type": self.agent_config.agent_type,
+                         "model": self.agent_config.model_id},
+        }
+        inputs = {"messages": [("user", prompt)], "collected_info": []}
+        await self.pacer.wait()
+        start = time.perf_counter()
+        state, trace = {}, None
+        async for event in self.agent_instance.astream(inputs, config):
+            if event.kind == "final":
+                state, trace = event.state, event.trace
+        usage = CostLedger.turn_usage(trace).values() if trace is not None else []
+        route = trace.route if trace is not None else None
+        return {
+            "prompt": prompt,
+            "answer": state["messages"][-1].content,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "prompt_tokens": sum(row["prompt_tokens"] for row in usage),
+            "completion_tokens": sum(row["completion_tokens"] for row in usage),
+            "cost": sum(row["cost"] for row in usage),
+            "iterations": trace.iterations if trace is not None else None,
+            "llm_calls": sum(1 for span in trace.spans if span.kind == "llm") if trace is not None else None,
+            "route": route,
+            "route_correct": (route == TOOLS) == needs_tools if route is not None and needs_tools is not None else None,
+        }
+
+    async def run_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a record's turns, retrying the whole conversation in a fresh thread on failure"""
+        async with self._slots:
+            error = None
+            for attempt in range(1, self.retries + 2):
+                thread_id = f"eval-{record['id']}-{uuid.uuid4().hex[:8]}"
+                try:
+                    turns = [await self.run_turn(thread_id, prompt, needs_tools)
+                             for prompt, needs_tools in zip(record["turns"], record["needs_tools"])]
+                    error = None
+                    break
+                except Exception as e:
+                    turns, error = [], f"{type(e).__name__}: {e}"
+                    if attempt > self.retries:
+                        break
+                    delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                    if is_rate_limit(e):
+                        delay = max(delay, retry_after(e) or 0.0)
+                        self.pacer.cool_down(delay)
+                    await asyncio.sleep(delay)
+        return {
+            "id": record["id"],
+            "agent": self.agent_config.name,
+            "model_id": self.agent_config.model_id,
+            "attempts": attempt,
+            "error": error,
+            "turns": turns,
+            "latency_ms": sum(turn["latency_ms"] for turn in turns),
+            "prompt_tokens": sum(turn["prompt_tokens"] for turn in turns),
+            "completion_tokens": sum(turn["completion_tokens"] for turn in turns),
+            "cost": sum(turn["cost"] for turn in turns),
+        }
+
+async def evaluate(evaluator: Evaluator, records: List[Dict[str, Any]], output: str) -> List[Dict[str, Any]]:
+    """Run records concurrently, appending each result to output as it finishes"""
+    results = []
+    with open(output, "a+", encoding="utf-8") as f:
+        # Don't glue the first result onto a line an interrupted run left unfinished
+        if f.tell() and (f.seek(f.tell() - 1) or f.read(1) != "\n"):
+            f.write("\n")
+        for task in asyncio.as_completed([evaluator.run_record(record) for record in records]):
+            result = await task
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            results.append(result)
+            status = result["error"] or f"{result['latency_ms']:.0f} ms"
+            print(f"[{len(results)}/{len(records)}] {result['id']}: {status}", file=sys.stderr)
+    return results
+
+def eval_config(args) -> AgentConfig:
+    """Agent config under evaluation, with any command-line overrides"""
+    if args.agent not in DEFAULT_AGENTS:
+        raise ValueError(f"Unknown agent {args.agent!r}; choose from {', '.join(DEFAULT_AGENTS)}")
+    config = DEFAULT_AGENTS[args.agent]
+    overrides = {}
+    if args.system_prompt_file:
+        with open(args.system_prompt_file, encoding="utf-8") as f:
+            overrides["system_prompt"] = f.read().strip()
+    if args.model:
+        overrides["model_id"] = args.model
+    if args.temperature is not None:
+        overrides["temperature"] = args.temperature
+    if args.fake and config.tools:
+        overrides["tools"] = list(FAKE_TOOLS)
+    # Cached answers would hide the agent's actual behaviour
+    return dataclasses.replace(config, cache_responses=False, **overrides)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Run a JSONL prompt set through an agent")
+    parser.add_argument("input", help="JSONL of {id, prompt} or {id, messages} records")
+    parser.add_argument("--agent", required=True, help="Name of a default agent, e.g. \"Coach Theo\"")
+    parser.add_argument("--system-prompt-file", help="Replace the agent's system prompt")
+    parser.add_argument("--model", help="Replace the agent's model id")
+    parser.add_argument("--temperature", type=float)
+    parser.add_argument("--output", help="Results JSONL (default: data/evals/<input name>-results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Records in flight at once")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per record after a failure")
+    parser.add_argument("--backoff", type=float, default=2.0, help="Base retry delay in seconds")
+    parser.add_argument("--rpm", type=float, default=0, help="Max turns started per minute (0 = unlimited)")
+    parser.add_argument("--intent-router", help="Override INTENT_ROUTER, e.g. \"off\" for a baseline run")
+    parser.add_argument("--fake", action="store_true", help="Use fake models and tools instead of real APIs")
+    parser.add_argument("--fake-latency", type=float, default=0.1, help="Fake model and tool latency in seconds")
+    args = parser.parse_args(argv)
+
+    # Eval threads don't need to outlive the run
+    PERFORMANCE_CONFIG.checkpoint_backend = "memory"
+    if args.intent_router is not None:
+        PERFORMANCE_CONFIG.intent_router = args.intent_router
+    model_factory = None
+    if args.fake:
+        PERFORMANCE_CONFIG.usage_db_path = os.path.join(tempfile.mkdtemp(prefix="gpfree-eval-"), "usage.sqlite")
+        register_fake_tools()
+        FAKE_TOOL_SETTINGS["latency"] = args.fake_latency
+        model_factory = fake_model_factory(latency=args.fake_latency)
+
+    agent_config = eval_config(args)
+    output = args.output or os.path.join(
+        "data", "evals", f"{os.path.splitext(os.path.basename(args.input))[0]}-results.jsonl"
+    )
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    done = completed_ids(output)
+    records = [record for record in read_records(args.input) if record["id"] not in done]
+    if done:
+        print(f"Resuming: {len(done)} records already in {output}", file=sys.stderr)
+
+    evaluator = Evaluator(agent_config, GraphCache(1, model_factory), args.concurrency,
+                          args.retries, args.backoff, Pacer(args.rpm))
+    start = time.perf_counter()
+    results = asyncio.run(evaluate(evaluator, records, output))
+    elapsed = time.perf_counter() - start
+
+    succeeded = [result for result in results if result["error"] is None]
+    stats = latency_stats([turn["latency_ms"] / 1000 for result in succeeded for turn in result["turns"]])
+    print(
+        f"{len(succeeded)}/{len(results)} records succeeded in {elapsed:.1f}s; "
+        f"turn p50 {stats['p50_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms; "
+        f"{sum(r['prompt_tokens'] + r['completion_tokens'] for r in succeeded)} tokens, "
+        f"${sum(r['cost'] for r in succeeded):.4f}. Results in {output}",
+        file=sys.stderr,
+    )
+    turns = [turn for result in succeeded for turn in result["turns"]]
+    routed = [turn for turn in turns if turn["route"] is not None]
+    if turns:
+        routing = ""
+        if routed:
+            labelled = [turn for turn in routed if turn["route_correct"] is not None]
+            routing = f"; {sum(turn['route'] == DIRECT for turn in routed)}/{len(routed)} turns took the direct route"
+            if labelled:
+                routing += f", routing accuracy {sum(turn['route_correct'] for turn in labelled)}/{len(labelled)}"
+        print(f"{sum(turn['llm_calls'] or 0 for turn in turns) / len(turns):.2f} model calls per turn{routing}",
+              file=sys.stderr)
+    if len(succeeded) < len(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
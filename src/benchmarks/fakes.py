@@ -0,0 +1,49 @@
+"""
+Deterministic stand-ins for the tools, so agent graphs can be exercised
+without Tavily or Qdrant. The matching chat model is agents.fake_model.
+"""
+import asyncio
+import json
+import time
+from langchain_core.tools import StructuredTool
+from tools.tool_registry import register_tool
+
+# Shared by every fake tool; set before a run
+FAKE_TOOL_SETTINGS = {"latency": 0.0, "payload_bytes": 2000}
+
+FAKE_TOOLS = {
+    "fake_search": "benchmarks.fakes:create_fake_search_tool",
+    "fake_rules": "benchmarks.fakes:create_fake_rules_tool",
+}
+
+def _payload(query: str) -> str:
+    """Search-result-shaped JSON of roughly the configured size"""
+    size = FAKE_TOOL_SETTINGS["payload_bytes"]
+    text = ("fake result for " + query + " ") * (size // (len(query) + 17) + 1)
+    return json.dumps([{"url": "https://example.com", "content": text[:size]}])
+
+def _make_tool(name: str, description: str) -> StructuredTool:
+    def run(query: str) -> str:
+        if FAKE_TOOL_SETTINGS["latency"]:
+            time.sleep(FAKE_TOOL_SETTINGS["latency"])
+        return _payload(query)
+
+    async def arun(query: str) -> str:
+        if FAKE_TOOL_SETTINGS["latency"]:
+            await asyncio.sleep(FAKE_TOOL_SETTINGS["latency"])
+        return _payload(query)
+
+    return StructuredTool.from_function(func=run, coroutine=arun, name=name, description=description)
+
+def create_fake_search_tool():
+    """Fake web search tool"""
+    return _make_tool("fake_search", "Fake web search")
+
+def create_fake_rules_tool():
+    """Fake rules retrieval tool"""
+    return _make_tool("fake_rules", "Fake rules lookup")
+
+def register_fake_tools():
+    """Make the fake tools available to agents by name"""
+    for name, factory in FAKE_TOOLS.items():
+        register_tool(name, factory)
@@ -0,0 +1,174 @@
+"""
+Load test for the chat flow with many concurrent users.
+
+Each simulated user is a thread calling ChatService.run_turn, which is what
+a Streamlit script run does in handle_user_input, against agents built on
+FakeChatModel and the fake tools. Concurrency ramps through stages while
+turn latency percentiles, error rate and process RSS are recorded.
+
+Usage (from src/):
+    python -m benchmarks.load_test --stages 1,4,16,64 --agent advanced_react
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from agents.fake_model import fake_model_factory
+from agents.graph_cache import GraphCache
+from config.performance_config import PERFORMANCE_CONFIG
+from services.chat_service import ChatService, TurnRequest
+from .fakes import FAKE_TOOL_SETTINGS, register_fake_tools
+from .run import benchmark_config, git_commit, latency_stats
+
+def current_rss_kb() -> int:
+    """Resident set size of this process in KiB"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # Peak rather than current RSS, but better than nothing off Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class RssSampler:
+    """Samples RSS on a background thread while a stage runs"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.samples: List[int] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(current_rss_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.samples.append(current_rss_kb())
+
+def simulate_user(service: ChatService, agent_type: str, turns: int, think_time: float,
+                  latencies: List[float], errors: List[str]):
+    """One user chatting in their own thread, like a Streamlit session"""
+    config = benchmark_config(agent_type)
+    thread_id = uuid.uuid4().hex
+    user = f"load-{thread_id[:8]}"
+    history: List[Dict[str, str]] = []
+    for turn in range(turns):
+        prompt = f"Question {turn}: how does grappling work?"
+        start = time.perf_counter()
+        try:
+            result = service.run_turn(TurnRequest(
+                user=user, agent_config=config, thread_id=thread_id, prompt=prompt, history=history,
+            ))
+            latencies.append(time.perf_counter() - start)
+            history += [{"role": "user", "content": prompt}, {"role": "assistant", "content": result.answer}]
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        if think_time:
+            time.sleep(random.uniform(0, 2 * think_time))
+
+def run_stage(service: ChatService, users: int, agent_type: str, turns: int,
+              think_time: float) -> Dict[str, Any]:
+    """Run one concurrency level to completion"""
+    latencies: List[float] = []
+    errors: List[str] = []
+    start = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=users, thread_name_prefix="user") as pool:
+        for _ in range(users):
+            pool.submit(simulate_user, service, agent_type, turns, think_time, latencies, errors)
+    elapsed = time.perf_counter() - start
+    attempts = len(latencies) + len(errors)
+    return {
+        "users": users,
+        "turns": attempts,
+        "turns_per_sec": len(latencies) / elapsed,
+        "error_rate": len(errors) / attempts if attempts else 0.0,
+        "errors": sorted(set(errors))[:5],
+        **latency_stats(latencies),
+        "rss_start_kb": rss.samples[0],
+        "rss_peak_kb": max(rss.samples),
+        "rss_end_kb": rss.samples[-1],
+    }
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Ramp concurrent simulated chat users")
+    parser.add_argument("--agent", default="react", help="Agent type to load")
+    parser.add_argument("--stages", default="1,2,4,8,16,32", help="Comma-separated concurrent user counts")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per user per stage")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds between a user's turns")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Fake model latency in seconds")
+    parser.add_argument("--tool-latency", type=float, default=0.3, help="Fake tool latency in seconds")
+    parser.add_argument("--slo-p95-ms", type=float, default=0.0, help="Stop ramping once p95 exceeds this")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Stop ramping above this error rate")
+    parser.add_argument("--output", help="Results file (default: data/benchmarks/load-<timestamp>-<commit>.json)")
+    args = parser.parse_args(argv)
+
+    # Keep load-test turns out of the real usage ledger and chat storage
+    scratch = tempfile.mkdtemp(prefix="gpfree-load-")
+    PERFORMANCE_CONFIG.usage_db_path = os.path.join(scratch, "usage.sqlite")
+    PERFORMANCE_CONFIG.storage_db_path = os.path.join(scratch, "storage.sqlite")
+    PERFORMANCE_CONFIG.checkpoint_db_path = os.path.join(scratch, "checkpoints.sqlite")
+    register_fake_tools()
+    FAKE_TOOL_SETTINGS["latency"] = args.tool_latency
+    service = ChatService(GraphCache(PERFORMANCE_CONFIG.graph_cache_size,
+                                     fake_model_factory(latency=args.model_latency)))
+
+    stages = []
+    capacity = 0
+    for users in (int(n) for n in args.stages.split(",")):
+        print(f"Running {users} concurrent users...", file=sys.stderr)
+        stage = run_stage(service, users, args.agent, args.turns, args.think_time)
+        stages.append(stage)
+        print(
+            f"  p50 {stage['p50_ms']:.0f} ms, p95 {stage['p95_ms']:.0f} ms, p99 {stage['p99_ms']:.0f} ms, "
+            f"{stage['turns_per_sec']:.1f} turns/s, {stage['error_rate']:.1%} errors, "
+            f"RSS peak {stage['rss_peak_kb'] / 1024:.0f} MiB",
+            file=sys.stderr,
+        )
+        healthy = stage["error_rate"] <= args.max_error_rate and (
+            not args.slo_p95_ms or stage["p95_ms"] <= args.slo_p95_ms
+        )
+        if not healthy:
+            print("  Stage outside limits; stopping the ramp", file=sys.stderr)
+            break
+        capacity = users
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": vars(args),
+        },
+        "capacity_users": capacity,
+        "stages": stages,
+    }
+    output = args.output or os.path.join(
+        "data", "benchmarks", f"load-{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Largest healthy stage: {capacity} users. Results written to {output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
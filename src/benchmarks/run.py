@@ -0,0 +1,252 @@
+"""
+Offline benchmarks for the agent graphs.
+
+Drives each agent type through its compiled graph with FakeChatModel and
+fake tools, and writes results as JSON so runs can be compared across
+commits.
+
+Usage (from src/):
+    python -m benchmarks.run
+    python -m benchmarks.run --agents react,advanced_react --sessions 32 --compare data/benchmarks/base.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from typing import Any, Dict, List
+from agents.fake_model import fake_model_factory
+from config.agent_config import AgentConfig
+from config.performance_config import PERFORMANCE_CONFIG
+from tools.tool_registry import get_tool_init_times
+from .fakes import FAKE_TOOL_SETTINGS, FAKE_TOOLS, register_fake_tools
+
+AGENT_TYPE_NAMES = ["plain", "react", "react_human", "advanced_react"]
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    """Summary of a list of durations, in milliseconds"""
+    ms = [s * 1000 for s in seconds]
+    return {
+        "mean_ms": statistics.fmean(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+    }
+
+def benchmark_config(agent_type: str) -> AgentConfig:
+    """Agent config for a benchmark run of one agent type"""
+    return AgentConfig(
+        name=f"bench-{agent_type}",
+        agent_type=agent_type,
+        model_id="llama-3.3-70b-versatile",
+        icon="⏱️",
+        system_prompt="You are a benchmark agent.",
+        tools=list(FAKE_TOOLS),
+    )
+
+def new_agent(agent_type: str, **model_settings):
+    """Fresh agent of a type backed by the fake model"""
+    from agents.agent_factory import create_agent_instance
+    return create_agent_instance(benchmark_config(agent_type), fake_model_factory(**model_settings))
+
+def turn_inputs(turn: int) -> Dict[str, Any]:
+    return {"messages": [("user", f"Question {turn}: what are the rules for grappling?")], "collected_info": []}
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id}, "metadata": {"user": "benchmark"}}
+
+def measure_build(agent_type: str, repeats: int) -> Dict[str, float]:
+    """Time to construct an agent and compile its graph"""
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        new_agent(agent_type).get_graph()
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+def measure_overhead(agent_type: str, turns: int) -> Dict[str, float]:
+    """Per-turn time with zero model and tool latency, i.e. pure framework overhead"""
+    FAKE_TOOL_SETTINGS["latency"] = 0.0
+    agent = new_agent(agent_type)
+    config = thread_config(uuid.uuid4().hex)
+    agent.invoke(turn_inputs(0), config)  # warm up
+    durations = []
+    for turn in range(1, turns + 1):
+        start = time.perf_counter()
+        agent.invoke(turn_inputs(turn), config)
+        durations.append(time.perf_counter() - start)
+    return latency_stats(durations)
+
+def measure_throughput(agent_type: str, sessions: int, turns: int,
+                       model_latency: float, tool_latency: float) -> Dict[str, float]:
+    """Turns per second with concurrent sessions sharing one compiled graph"""
+    FAKE_TOOL_SETTINGS["latency"] = tool_latency
+    agent = new_agent(agent_type, latency=model_latency)
+    agent.get_graph()
+    durations: List[float] = []
+
+    async def session(thread_id: str):
+        config = thread_config(thread_id)
+        for turn in range(turns):
+            start = time.perf_counter()
+            await agent.ainvoke(turn_inputs(turn), config)
+            durations.append(time.perf_counter() - start)
+
+    async def run_all():
+        await asyncio.gather(*(session(uuid.uuid4().hex) for _ in range(sessions)))
+
+    start = time.perf_counter()
+    asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+    FAKE_TOOL_SETTINGS["latency"] = 0.0
+    return {"sessions": sessions, "turns_per_sec": len(durations) / elapsed, **latency_stats(durations)}
+
+def _rss_kb() -> int:
+    """Peak resident set size of this process (KiB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def measure_memory(agent_type: str, turns: int) -> Dict[str, float]:
+    """Python heap growth over one long conversation"""
+    agent = new_agent(agent_type)
+    config = thread_config(uuid.uuid4().hex)
+    agent.invoke(turn_inputs(0), config)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    rss_before = _rss_kb()
+    durations = []
+    for turn in range(1, turns + 1):
+        start = time.perf_counter()
+        agent.invoke(turn_inputs(turn), config)
+        durations.append(time.perf_counter() - start)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Late turns should cost about the same as early ones if history is bounded
+    tenth = max(1, turns // 10)
+    return {
+        "turns": turns,
+        "heap_growth_kb": (after - before) / 1024,
+        "heap_growth_per_turn_kb": (after - before) / 1024 / turns,
+        "heap_peak_kb": peak / 1024,
+        "peak_rss_growth_kb": _rss_kb() - rss_before,
+        "first_turns_mean_ms": statistics.fmean(durations[:tenth]) * 1000,
+        "last_turns_mean_ms": statistics.fmean(durations[-tenth:]) * 1000,
+    }
+
+def git_commit() -> str:
+    """Current commit hash, or "unknown" outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted metric names"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+# Metrics where a larger value is an improvement
+HIGHER_IS_BETTER = ("turns_per_sec",)
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Print metric changes against a baseline and return the regressions"""
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    regressions = []
+    print(f"{'metric':60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(old.keys() & new.keys()):
+        if name.endswith((".sessions", ".turns")) or not old[name]:
+            continue
+        change = (new[name] - old[name]) / abs(old[name])
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        flag = " !" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:60} {old[name]:12.2f} {new[name]:12.2f} {change:+8.1%}{flag}")
+    return regressions
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Offline agent graph benchmarks")
+    parser.add_argument("--agents", default=",".join(AGENT_TYPE_NAMES), help="Comma-separated agent types")
+    parser.add_argument("--build-repeats", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=50, help="Turns for the overhead benchmark")
+    parser.add_argument("--sessions", type=int, default=16, help="Concurrent sessions for throughput")
+    parser.add_argument("--session-turns", type=int, default=5)
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Fake model latency in seconds")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="Fake tool latency in seconds")
+    parser.add_argument("--long-turns", type=int, default=200, help="Turns for the memory benchmark")
+    parser.add_argument("--output", help="Results file (default: data/benchmarks/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change flagged as a regression")
+    args = parser.parse_args(argv)
+
+    # Keep benchmark turns out of the real usage ledger and checkpoints
+    PERFORMANCE_CONFIG.usage_db_path = os.path.join(tempfile.mkdtemp(prefix="gpfree-bench-"), "usage.sqlite")
+    PERFORMANCE_CONFIG.checkpoint_backend = "memory"
+    register_fake_tools()
+
+    results = {}
+    for agent_type in args.agents.split(","):
+        print(f"Benchmarking {agent_type}...", file=sys.stderr)
+        results[agent_type] = {
+            "build": measure_build(agent_type, args.build_repeats),
+            "overhead": measure_overhead(agent_type, args.turns),
+            "throughput": measure_throughput(agent_type, args.sessions, args.session_turns,
+                                             args.model_latency, args.tool_latency),
+            "memory": measure_memory(agent_type, args.long_turns),
+        }
+    # Build cost of each tool the runs used, paid once per process
+    results["tools"] = {"init_seconds": get_tool_init_times()}
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "params": vars(args),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        "data", "benchmarks", f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,17 @@
+import threading
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional
+import pandas as pd
 import streamlit as st
-from utils.session import get_current_session
+from utils.session import get_current_session, show_earlier_messages
 from config.agent_config import DEFAULT_AGENTS
 from config.user_agents import get_user_agents
-from agents.react_agent import ReactAgent
-from agents.react_human_agent import ReactHumanAgent
-from agents.advanced_react_agent import AdvancedReactAgent
-from agents.plain_agent import PlainAgent
+from services.chat_service import TurnRequest
+from services.job_queue import CANCELLED, get_job_queue
+from utils.response_cache import get_response_cache
+from utils.cost_ledger import format_dollars, get_cost_ledger
+from agents.intent_router import TOOLS, get_routing_stats
+from config.performance_config import PERFORMANCE_CONFIG
 
 def render_chat_interface():
     """Render the main chat interface"""
@@ -19,12 +25,13 @@ def render_chat_interface():
         
     render_agent_info(session)
     render_chat_messages(session)
+    render_pending_job(session)
     handle_user_input(session)
 
 def render_agent_info(session):
     """Render agent configuration information"""
     all_agents = {**DEFAULT_AGENTS, **get_user_agents()}
-    agent_config = all_agents[session["agent"]]
+    agent_config = all_agents[session.agent]
     
     with st.expander("Agent Configuration", expanded=False):
         model_config = agent_config.get_model_config()
@@ -33,89 +40,185 @@ def render_agent_info(session):
         st.write(f"Temperature: {agent_config.temperature}")
         st.write(f"System Prompt: {agent_config.system_prompt}")
         st.write(f"Tools: {', '.join(agent_config.tools or [])}")
+        if PERFORMANCE_CONFIG.usage_db_path:
+            ledger = get_cost_ledger()
+            usage = ledger.thread_usage(session.thread_id)
+            st.write(f"Session Usage: {usage.total_tokens:,} tokens, ${usage.cost:.4f}")
+            budget = ledger.budget(st.session_state.username)
+            spent = ledger.spent_today(st.session_state.username)
+            st.write(f"Spent Today: ${spent:.4f}" + (f" of {format_dollars(budget)}" if budget > 0 else ""))
+        if agent_config.cache_responses:
+            stats = get_response_cache().stats(agent_config.cache_key())
+            st.write(
+                f"Response Cache: {stats['exact']} exact hits, "
+                f"{stats['semantic']} semantic hits, {stats['miss']} misses"
+            )
+        if PERFORMANCE_CONFIG.intent_router not in ("", "off"):
+            # Process-wide, across every agent of this type
+            for route, totals in sorted(get_routing_stats().summary(agent_config.agent_type).items()):
+                st.write(
+                    f"Route {route}: {totals['turns']} turns, {totals['mean_llm_calls']:.1f} model calls "
+                    f"and {totals['mean_ms']:.0f} ms per turn" + (
+                        f", {totals['unused']} without a tool call" if route == TOOLS else ""
+                    )
+                )
+
+class PreparedTrace(NamedTuple):
+    """A latency breakdown ready to render"""
+    title: str
+    steps: Any  # DataFrame
+
+_prepared_traces: "OrderedDict[str, PreparedTrace]" = OrderedDict()
+_prepared_lock = threading.Lock()
+
+def prepare_trace(trace, key: str = "") -> PreparedTrace:
+    """
+    Title and step table for a turn's trace. Building the DataFrame is the
+    costliest part of drawing an old message, so results are kept per
+    message key across reruns and sessions.
+    """
+    if key:
+        with _prepared_lock:
+            prepared = _prepared_traces.get(key)
+            if prepared is not None:
+                _prepared_traces.move_to_end(key)
+                return prepared
+    title = f"⏱️ {trace['total_ms']:,.0f} ms"
+    if "tokens" in trace:
+        title += f" · {trace['tokens']:,} tokens · ${trace['cost']:.4f}"
+    if trace.get("route") == "direct":
+        title += " · skipped tools"
+    prepared = PreparedTrace(title, pd.DataFrame(trace["steps"]))
+    if key:
+        with _prepared_lock:
+            _prepared_traces[key] = prepared
+            while len(_prepared_traces) > PERFORMANCE_CONFIG.chat_render_cache_size:
+                _prepared_traces.popitem(last=False)
+    return prepared
 
 def render_chat_messages(session):
-    """Render chat message history"""
+    """Render the newest window of the chat; older messages load on demand"""
     all_agents = {**DEFAULT_AGENTS, **get_user_agents()}
-    agent_config = all_agents[session["agent"]]
+    agent_config = all_agents[session.agent]
+    
+    # Keeps rerun cost proportional to the window, not the whole conversation
+    if session.hidden and st.button("⬆️ Show earlier messages", key=f"earlier-{session.id}"):
+        show_earlier_messages(session)
     
-    for message in session["messages"]:
-        with st.chat_message(message["role"], avatar=agent_config.icon if message["role"] == "assistant" else None):
-            st.markdown(message["content"])
+    for message in session.window():
+        with st.chat_message(message.role, avatar=agent_config.icon if message.role == "assistant" else None):
+            st.markdown(message.content)
+            if message.trace:
+                render_latency_breakdown(message.trace, message.key)
+
+def render_latency_breakdown(trace, key: Optional[str] = None):
+    """Render where a turn's time and tokens went"""
+    prepared = prepare_trace(trace, key or "")
+    with st.expander(prepared.title, expanded=False):
+        st.table(prepared.steps)
 
 def handle_user_input(session):
-    """Handle user chat input and agent responses"""
+    """Handle user chat input by submitting the turn to the job queue"""
     if prompt := st.chat_input("What would you like to know?"):
         all_agents = {**DEFAULT_AGENTS, **get_user_agents()}
-        agent_config = all_agents[session["agent"]]
+        agent_config = all_agents[session.agent]
+        
+        request = TurnRequest(
+            user=st.session_state.username,
+            agent_config=agent_config,
+            thread_id=session.thread_id,
+            prompt=prompt,
+            history=session.history(PERFORMANCE_CONFIG.response_cache_context_turns),
+        )
+        try:
+            job_id = get_job_queue().submit(request)
+        except ValueError as e:
+            st.warning(str(e))
+            return
         
         # Add user message
-        session["messages"].append({"role": "user", "content": prompt})
+        session.add_message("user", prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Create agent instance
-        if agent_config.agent_type == "react":
-            agent_instance = ReactAgent(agent_config)
-        elif agent_config.agent_type == "react_human":
-            agent_instance = ReactHumanAgent(agent_config)
-        elif agent_config.agent_type == "advanced_react":
-            agent_instance = AdvancedReactAgent(agent_config)
-        elif agent_config.agent_type == "plain":
-            agent_instance = PlainAgent(agent_config)
+        # The job runs in the background; reruns pick it up from the session
+        session.pending_job = job_id
+        render_pending_job(session)
 
-        agent = agent_instance.create()
+def render_pending_job(session):
+    """Follow the session's in-flight turn until it finishes, then record the answer"""
+    job_id = session.pending_job
+    if not job_id:
+        return
+    job_queue = get_job_queue()
+    job = job_queue.get(job_id)
+    if job is None:
+        # Expired while nobody was watching
+        session.pending_job = None
+        return
+    agent_config = job.request.agent_config
+    
+    with st.chat_message("assistant", avatar=agent_config.icon):
+        progress_placeholder = st.empty()
+        message_placeholder = st.empty()
+        stop_placeholder = st.empty()
+        ahead = job_queue.position(job_id)
+        message_placeholder.markdown(f"⏳ Waiting for a free worker ({ahead} ahead)..." if ahead else "🤔 Thinking...")
+        
+        # Clicking reruns the script; the job keeps running until cancelled here
+        if stop_placeholder.button("⏹ Stop", key=f"stop-{job_id}"):
+            job_queue.cancel(job_id)
         
-        # Show assistant is thinking
-        with st.chat_message("assistant", avatar=agent_config.icon):
-            message_placeholder = st.empty()
+        # Replays events from the start, so a rerun mid-turn redraws the progress
+        result = stream_response(job_queue.follow(job_id), progress_placeholder, message_placeholder)
+        stop_placeholder.empty()
+        session.pending_job = None
+        
+        if result is None:
+            answer = "⏹ Stopped." if job.status == CANCELLED else f"⚠️ The agent failed: {job.error}"
+            message_placeholder.markdown(answer)
+            session.add_message("assistant", answer)
+            return
+        
+        # Display collected information in an expander
+        if agent_config.agent_type == "advanced_react" and result.cache_tier is None and not result.refused:
+            with st.expander("🔍 Information Collected", expanded=False):
+                for info in result.collected_info:
+                    st.write(info)
+        
+        # Update the message placeholder
+        message_placeholder.markdown(result.answer)
+        
+        # Keep the per-step timings with the message so reruns can show them
+        if result.trace is not None:
+            render_latency_breakdown(result.trace)
+        
+        # Add assistant message to chat history
+        session.add_message("assistant", result.answer, result.trace)
+
+def stream_response(events, progress_placeholder, message_placeholder):
+    """Render a chat turn's events as they arrive and return its TurnResult"""
+    progress_lines = []
+    partial_text = ""
+    result = None
+    
+    for event in events:
+        if event.kind == "token":
+            partial_text += event.content
+            message_placeholder.markdown(partial_text + "▌")
+        elif event.kind == "tool_call":
+            progress_lines.append(f"🔧 Calling `{event.name}`...")
+            # Text before a tool call is reasoning, not the answer
+            partial_text = ""
             message_placeholder.markdown("🤔 Thinking...")
-            
-            # Configure memory settings
-            config = {
-                "configurable": {
-                    "thread_id": session["thread_id"],
-                    "memory": session.get("memory")
-                },
-                "metadata": {
-                    "agent_type": agent_config.agent_type,
-                    "model": agent_config.model_id,
-                    "temperature": agent_config.temperature
-                }
-            }
-            
-            # Get response from agent
-            response = agent.invoke(
-                {
-                    "messages": [
-                        *[("human" if m["role"] == "user" else "assistant", m["content"]) 
-                          for m in session["messages"][:-1]],
-                        ("user", prompt)
-                    ],
-                    "collected_info": []  # Initialize collected_info for advanced_react
-                },
-                config=config
-            )
-            
-            # Extract the final message based on agent type
-            if agent_config.agent_type == "advanced_react":
-                final_message = response["messages"][-1]
-                collected_info = response.get("collected_info", [])
-                
-                # Display collected information in an expander
-                with st.expander("🔍 Information Collected", expanded=False):
-                    for info in collected_info:
-                        st.write(info)
-            else:
-                final_message = response["messages"][-1]
-            
-            # Update the message placeholder
-            message_placeholder.markdown(final_message.content)
-            
-            # Update memory in session
-            session["memory"] = config["configurable"]["memory"]
-            
-            # Add assistant message to chat history
-            session["messages"].append(
-                {"role": "assistant", "content": final_message.content}
-            )
+        elif event.kind == "tool_result":
+            progress_lines.append(f"✅ `{event.name}` returned {len(event.content):,} characters")
+        elif event.kind == "notice":
+            progress_lines.append(event.content)
+        elif event.kind == "final":
+            result = event.result
+        
+        if event.kind in ("tool_call", "tool_result", "notice"):
+            progress_placeholder.caption("  \n".join(progress_lines))
+    
+    return result
@@ -3,14 +3,10 @@ from config.agent_config import DEFAULT_AGENTS
 from config.user_agents import get_user_agents, UserAgent, save_user_agent
 from config.model_config import AVAILABLE_MODELS
 from tools.tool_registry import AVAILABLE_TOOLS
-from utils.session import create_new_session, get_current_session
-from agents.react_agent import ReactAgent
-from agents.react_human_agent import ReactHumanAgent
-from agents.advanced_react_agent import AdvancedReactAgent
-from config.diagram_config import get_agent_graph
+from utils.session import activate_session, get_current_session, get_session_store, reset_session
+from config.diagram_config import get_agent_diagram
 from auth.auth import login
 from styles.login import get_login_styles
-from agents.plain_agent import PlainAgent
 
 def render_sidebar():
     """Render the sidebar with agent controls"""
@@ -40,27 +36,13 @@ def render_agent_selection():
     if st.button("🗑️ Clear Chat", key="clear_chat", use_container_width=True):
         session_id, session = get_current_session()
         if session:
-            session["messages"] = []
+            # Starts a fresh checkpoint thread so the old history isn't restored
+            reset_session(session)
             st.rerun()
     
-    # Handle new agent selection
-    if selected_agent != st.session_state.current_session:
-        agent_config = all_agents[selected_agent]
-        agent_instance = create_agent_instance(agent_config)
-        create_new_session(selected_agent, agent_config, agent_instance)
-
-def create_agent_instance(agent_config):
-    """Create appropriate agent instance based on type"""
-    if agent_config.agent_type == "react":
-        return ReactAgent(agent_config)
-    elif agent_config.agent_type == "react_human":
-        return ReactHumanAgent(agent_config)
-    elif agent_config.agent_type == "advanced_react":
-        return AdvancedReactAgent(agent_config)
-    elif agent_config.agent_type == "plain":
-        return PlainAgent(agent_config)
-    else:
-        raise ValueError(f"Unknown agent type: {agent_config.agent_type}")
+    # Handle new agent selection, resuming the agent's earlier chat if it's still kept
+    if selected_agent != get_session_store().current_agent:
+        activate_session(selected_agent)
 
 def render_agent_creation(tab):
     """Render agent creation form"""
@@ -114,6 +96,11 @@ def render_agent_creation(tab):
                 help="Choose the tools this agent can use"
             )
             
+            cache_responses = st.checkbox(
+                "Cache Responses",
+                help="Answer repeated prompts from the response cache instead of rerunning the agent"
+            )
+            
             # Add after model selection
             if agent_type == "router":
                 secondary_model = st.selectbox(
@@ -132,7 +119,8 @@ def render_agent_creation(tab):
                         icon="🤖",
                         temperature=temperature,
                         system_prompt=system_prompt,
-                        tools=selected_tools
+                        tools=selected_tools,
+                        cache_responses=cache_responses
                     )
                     save_user_agent(new_agent)
                     st.success(f"Agent '{name}' created successfully!")
@@ -150,17 +138,14 @@ def render_architecture_diagrams():
             help="View the workflow diagram for each agent type"
         )
         
-        description, graph_png = get_agent_graph(agent_type)
+        diagram = get_agent_diagram(agent_type)
         st.markdown(f"**{agent_type.title()} Agent**")
-        st.markdown(description)
-        st.image(graph_png)
+        st.markdown(diagram.description)
+        if diagram.png is not None:
+            st.image(diagram.png)
+        else:
+            # Without the graphviz binaries the browser lays out the diagram itself
+            st.graphviz_chart(diagram.dot)
         
     except Exception as e:
-        st.error(f"""
-        Error generating diagram: {str(e)}
-        Please make sure you have graphviz installed:
-        ```bash
-        sudo apt-get install graphviz  # For Ubuntu/Debian
-        brew install graphviz          # For macOS
-        ```
-        """)
\ No newline at end of file
+        st.error(f"Error generating diagram: {str(e)}")
\ No newline at end of file
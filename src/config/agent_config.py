@@ -1,3 +1,5 @@
+import hashlib
+import json
 from dataclasses import dataclass
 from typing import List, Optional, Literal
 from config.model_config import ModelConfig
@@ -11,12 +13,27 @@ class AgentConfig:
     temperature: float = 0.7
     system_prompt: str = ""
     tools: List[str] = None
+    # Opt in to serving repeated prompts from the response cache
+    cache_responses: bool = False
 
     def get_model_config(self, model_id: str = None) -> ModelConfig:
         """Get the full model configuration"""
         from config.model_config import get_model_by_id
         return get_model_by_id(model_id or self.model_id)
 
+    def cache_key(self) -> str:
+        """Hash of the fields that determine the compiled agent graph"""
+        payload = json.dumps(
+            [
+                self.agent_type,
+                self.model_id,
+                self.temperature,
+                self.system_prompt,
+                sorted(self.tools or []),
+            ]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 # Example configurations
 DEFAULT_AGENTS = {
     "Simple Chat": AgentConfig(
@@ -40,7 +57,8 @@ DEFAULT_AGENTS = {
         model_id="llama-3.3-70b-versatile",
         icon="🗡️",
         system_prompt="You are a helpful AI assistant for Dungeons & Dragons. Your role is to assist players and Dungeon Masters with rules, dice rolls, and general gameplay questions.",
-        tools=["tavily_tool"]
+        tools=["tavily_tool"],
+        cache_responses=True
     ),    
     "Crypto Pal": AgentConfig(
         name="Crypto Pal",
@@ -48,6 +66,7 @@ DEFAULT_AGENTS = {
         model_id="llama-3.3-70b-versatile",
         icon="₿",
         system_prompt="You are a helpful AI assistant for Bitcoin. You are a Bitcoin expert and can answer any questions about Bitcoin or other crypto currencies.",
-        tools=["tavily_tool"]
+        tools=["tavily_tool"],
+        cache_responses=True
     )
 } 
\ No newline at end of file
@@ -1,105 +1,154 @@
-from typing import Dict
-from langgraph.graph import StateGraph, START, END
-from langgraph.graph.message import add_messages
-from typing import Annotated, TypedDict, List
-from typing_extensions import TypedDict
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+import streamlit as st
+from config.performance_config import PERFORMANCE_CONFIG
 
-class AgentState(TypedDict):
-    messages: Annotated[List[str], add_messages]
+# Bump when to_dot's styling changes, so cached renders are redrawn
+DIAGRAM_STYLE_VERSION = 1
 
-def get_agent_graph(agent_type: str) -> tuple[str, bytes]:
-    """Dynamically create and return agent graph and description"""
-    descriptions = {
-        "plain": """
-        A simple agent that directly uses the LLM without any tools or complex workflows.
-        Just takes user input, processes with system prompt, and returns response.
-        """,
-        "react": """
-        A ReAct agent that follows a simple workflow:
-        1. Agent receives input and determines if tools are needed
-        2. If tools are needed, executes them and returns results
-        3. Process continues until completion
-        """,
-        "react_human": """
-        A ReAct agent with human-in-the-loop capabilities that:
-        1. Agent determines if tools are needed
-        2. If tools needed, waits for human approval
-        3. Upon approval, executes tools and returns to agent
-        4. Upon rejection, returns to agent for alternative approach
-        """,
-        "advanced_react": """
-        A ReAct agent that uses two LLMs:
-        1. Router LLM determines whether to use tools or generate final response
-        2. If tools are needed, executes them and returns to router
-        3. If final response needed, passes to Response LLM for detailed answer
-        """
-    }
-    
-    if agent_type not in descriptions:
+DESCRIPTIONS = {
+    "plain": """
+    A simple agent that directly uses the LLM without any tools or complex workflows.
+    Just takes user input, processes with system prompt, and returns response.
+    """,
+    "react": """
+    A ReAct agent that follows a simple workflow:
+    1. Agent receives input and determines if tools are needed
+    2. If tools are needed, executes them and returns results
+    3. Process continues until completion
+    With the intent router on, messages that need no tools skip to a single direct call.
+    """,
+    "react_human": """
+    A ReAct agent with human-in-the-loop capabilities that:
+    1. Agent determines if tools are needed
+    2. If tools needed, waits for human approval
+    3. Upon approval, executes tools and returns to agent
+    4. Upon rejection, returns to agent for alternative approach
+    With the intent router on, messages that need no tools skip to a single direct call.
+    """,
+    "advanced_react": """
+    A ReAct agent that uses two LLMs:
+    1. Router LLM determines whether to use tools or generate final response
+    2. If tools are needed, executes them and returns to router
+    3. If final response needed, passes to Response LLM for detailed answer
+    With the intent router on, messages that need no tools go straight to the Response LLM with the chat history.
+    """
+}
+
+@dataclass
+class AgentDiagram:
+    """An agent type's workflow diagram; png and svg are None without the graphviz binaries"""
+    agent_type: str
+    description: str
+    fingerprint: str
+    dot: str
+    png: Optional[bytes] = None
+    svg: Optional[bytes] = None
+
+def agent_structure(agent_type: str):
+    """Drawable graph of an agent type, taken from the real agent class"""
+    if agent_type not in DESCRIPTIONS:
         raise ValueError(f"Unknown agent type: {agent_type}")
-    
-    # Create graph
-    workflow = StateGraph(AgentState)
-    
-    # Add nodes and edges based on agent type
-    if agent_type == "plain":
-        workflow.add_node("agent", lambda x: x)
-        workflow.set_entry_point("agent")
-        workflow.add_edge("agent", END)
-        
-    elif agent_type == "react":
-        workflow.add_node("agent", lambda x: x)
-        workflow.add_node("tools", lambda x: x)
-        workflow.set_entry_point("agent")
-        workflow.add_conditional_edges(
-            "agent",
-            lambda x: "complete" if x else "continue",
-            {
-                "complete": END,
-                "continue": "tools"
-            }
-        )
-        workflow.add_edge("tools", "agent")
-        
-    elif agent_type == "react_human":
-        workflow.add_node("agent", lambda x: x)
-        workflow.add_node("human_approval", lambda x: x)
-        workflow.add_node("tools", lambda x: x)
-        workflow.set_entry_point("agent")
-        workflow.add_conditional_edges(
-            "agent",
-            lambda x: "complete" if x else "approval",
-            {
-                "complete": END,
-                "approval": "human_approval"
-            }
-        )
-        workflow.add_conditional_edges(
-            "human_approval",
-            lambda x: "approved" if x else "rejected",
-            {
-                "approved": "tools",
-                "rejected": "agent"
-            }
-        )
-        workflow.add_edge("tools", "agent")
-        
-    elif agent_type == "advanced_react":
-        workflow.add_node("router", lambda x: x)
-        workflow.add_node("tools", lambda x: x)
-        workflow.add_node("response", lambda x: x)
-        workflow.set_entry_point("router")
-        workflow.add_conditional_edges(
-            "router",
-            lambda x: "continue" if x else "respond",
-            {
-                "continue": "tools",
-                "respond": "response"
-            }
-        )
-        workflow.add_edge("tools", "router")
-        workflow.add_edge("response", END)
-    
-    # Generate PNG using default LangGraph visualization
-    graph = workflow.compile().get_graph()
-    return descriptions[agent_type], graph.draw_mermaid_png()
\ No newline at end of file
+    from agents.agent_factory import create_agent_instance
+    from agents.fake_model import fake_model_factory
+    from config.agent_config import AgentConfig
+    from config.model_config import AVAILABLE_MODELS
+    # The graph's shape doesn't depend on the model, so a fake one avoids API clients
+    config = AgentConfig(name=f"diagram-{agent_type}", agent_type=agent_type,
+                         model_id=next(iter(AVAILABLE_MODELS)), icon="", tools=[])
+    return create_agent_instance(config, fake_model_factory()).get_graph().get_graph()
+
+def fingerprint(agent_type: str, graph) -> str:
+    """Hash of a graph's nodes and edges"""
+    payload = json.dumps([
+        DIAGRAM_STYLE_VERSION,
+        agent_type,
+        sorted(graph.nodes),
+        sorted((edge.source, edge.target, edge.conditional, str(edge.data)) for edge in graph.edges),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def to_dot(graph) -> str:
+    """Graphviz source for a drawable graph; conditional edges are dashed"""
+    lines = [
+        "digraph {",
+        '  graph [bgcolor="transparent", rankdir=TB];',
+        '  node [shape=box, style="rounded,filled", fillcolor="#262730", fontcolor="#FAFAFA", '
+        'color="#FAFAFA", fontname="Helvetica"];',
+        '  edge [color="#AAAAAA", fontcolor="#AAAAAA", fontname="Helvetica", fontsize=10];',
+    ]
+    for node in graph.nodes:
+        if node in ("__start__", "__end__"):
+            label = node.strip("_")
+            lines.append(f'  "{node}" [label="{label}", shape=oval, fillcolor="#ff4b4b"];')
+        else:
+            lines.append(f'  "{node}";')
+    for edge in graph.edges:
+        attrs = []
+        if edge.conditional:
+            attrs.append("style=dashed")
+        if edge.data:
+            attrs.append(f'label="{edge.data}"')
+        lines.append(f'  "{edge.source}" -> "{edge.target}"' + (f" [{', '.join(attrs)}]" if attrs else "") + ";")
+    lines.append("}")
+    return "\n".join(lines)
+
+def render_dot(dot: str, fmt: str) -> Optional[bytes]:
+    """Render Graphviz source locally, or None if the dot binary isn't installed"""
+    try:
+        import graphviz
+    except ImportError:
+        return None
+    try:
+        return graphviz.Source(dot).pipe(format=fmt)
+    except (graphviz.ExecutableNotFound, graphviz.CalledProcessError):
+        return None
+
+def _read(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def _write(path: str, data: bytes):
+    # Write then rename, so a concurrent reader never sees a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def build_diagram(agent_type: str, cache_dir: str = None) -> AgentDiagram:
+    """
+    Diagram for an agent type, from the disk cache when its graph hasn't
+    changed shape. Files are named by structure fingerprint, so a changed
+    agent class gets a fresh render and the stale files are removed.
+    """
+    cache_dir = cache_dir or PERFORMANCE_CONFIG.diagram_cache_dir
+    graph = agent_structure(agent_type)
+    key = fingerprint(agent_type, graph)
+    base = os.path.join(cache_dir, f"{agent_type}-{key}")
+    diagram = AgentDiagram(agent_type, DESCRIPTIONS[agent_type], key, to_dot(graph),
+                           _read(f"{base}.png"), _read(f"{base}.svg"))
+    if diagram.png is not None and diagram.svg is not None:
+        return diagram
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"{agent_type}-") and not name.startswith(f"{agent_type}-{key}."):
+            os.remove(os.path.join(cache_dir, name))
+    _write(f"{base}.dot", diagram.dot.encode("utf-8"))
+    for fmt in ("png", "svg"):
+        data = render_dot(diagram.dot, fmt)
+        if data is not None:
+            _write(f"{base}.{fmt}", data)
+            setattr(diagram, fmt, data)
+    return diagram
+
+@st.cache_resource(show_spinner=False)
+def get_agent_diagram(agent_type: str) -> AgentDiagram:
+    """Diagram for an agent type, built at most once per process"""
+    return build_diagram(agent_type)
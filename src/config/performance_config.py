@@ -0,0 +1,165 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+def _env_int(key: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    value = os.getenv(key)
+    return int(value) if value else default
+
+
+def _env_float(key: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    value = os.getenv(key)
+    return float(value) if value else default
+
+
+def _env_str(key: str, default: str) -> str:
+    """Read a string setting from the environment"""
+    return os.getenv(key) or default
+
+
+def _env_limits(key: str, cast=int) -> Dict[str, int]:
+    """Read a "name=limit,name=limit" mapping from the environment"""
+    limits = {}
+    for item in (os.getenv(key) or "").split(","):
+        if "=" in item:
+            name, limit = item.split("=", 1)
+            limits[name.strip()] = cast(limit)
+    return limits
+
+
+@dataclass
+class PerformanceConfig:
+    graph_cache_size: int = 32
+    checkpoint_backend: str = "sqlite"  # or "memory", which keeps every step of every thread on the heap
+    checkpoint_db_path: str = "data/checkpoints.sqlite"
+    history_context_fraction: float = 0.75
+    history_summary_cache_size: int = 1024
+    tool_max_workers: int = 16  # cap on any one tool's worker threads
+    tool_concurrency_limit: int = 4
+    tool_concurrency_limits: Dict[str, int] = field(default_factory=dict)
+    tool_timeout: float = 30.0
+    response_cache_db_path: str = "data/response_cache.sqlite"
+    response_cache_ttl: float = 3600.0
+    response_cache_max_entries: int = 5000
+    response_cache_similarity_threshold: float = 0.92
+    response_cache_embedding_model: str = ""  # empty disables the semantic tier
+    response_cache_context_turns: int = 1
+    search_cache_ttl: float = 900.0
+    search_cache_max_entries: int = 1024
+    search_cache_disk_path: str = ""  # empty keeps the cache in memory only
+    retrieval_backend: str = "qdrant"  # "qdrant" or "local"
+    retrieval_index_path: str = "data/dnd_index"
+    retrieval_embedder: str = "sentence-transformers"  # or "hashing", "huggingface-api"
+    retrieval_embedding_model: str = "sentence-transformers/all-mpnet-base-v2"
+    retrieval_token_budget: int = 1200
+    retrieval_candidates: int = 20
+    retrieval_rrf_k: int = 60
+    retrieval_reranker_model: str = ""  # cross-encoder name; empty disables reranking
+    embedding_cache_max_entries: int = 4096
+    embedding_cache_disk_path: str = ""  # empty keeps the cache in memory only
+    embedding_batch_window: float = 0.01  # seconds; 0 disables micro-batching
+    embedding_max_batch: int = 32
+    ingest_chunk_size: int = 1000
+    ingest_chunk_overlap: int = 200
+    ingest_batch_size: int = 64
+    ingest_workers: int = 4
+    ingest_manifest_path: str = "data/ingest_manifest.sqlite"
+    trace_sinks: str = "memory"  # comma-separated: "memory", "jsonl", "prometheus"
+    trace_buffer_size: int = 500
+    trace_jsonl_path: str = "data/traces.jsonl"
+    trace_flush_interval: float = 1.0  # seconds between background writes of jsonl traces
+    trace_prometheus_port: int = 0  # 0 keeps the metrics endpoint off
+    usage_db_path: str = "data/usage.sqlite"  # empty disables cost accounting
+    usage_flush_interval: float = 1.0  # seconds between background writes of usage rows
+    cost_budget_daily: float = 0.0  # dollars per user per day; 0 means unlimited
+    cost_budgets: Dict[str, float] = field(default_factory=dict)  # per-user overrides
+    cost_budget_action: str = "downgrade"  # or "refuse"
+    cost_budget_fallback_model: str = ""  # empty picks the cheapest model; must cost less than the agent's
+    job_max_concurrency: int = 8
+    job_per_user_limit: int = 1
+    job_max_queued_per_user: int = 5
+    job_retention: float = 3600.0  # seconds finished jobs stay available
+    session_max_count: int = 8  # chat sessions kept per browser session
+    session_idle_ttl: float = 3600.0  # seconds before an idle chat session is dropped
+    session_max_messages: int = 500  # messages kept in memory per chat session
+    session_page_size: int = 50  # messages loaded at a time when a stored thread is opened
+    chat_window_size: int = 20  # newest messages rendered; older ones load on demand
+    chat_render_cache_size: int = 1024  # prepared messages kept across reruns
+    diagram_cache_dir: str = "data/diagrams"
+    storage_backend: str = "sqlite"  # empty keeps users, agents and chats in memory only
+    storage_db_path: str = "data/storage.sqlite"
+    storage_batch_size: int = 50  # buffered messages that trigger a write
+    storage_flush_interval: float = 1.0  # seconds between background writes
+    intent_router: str = "heuristic"  # "off", "heuristic" or a "module:factory" classifier
+
+
+# Process-wide performance settings, overridable through environment variables
+PERFORMANCE_CONFIG = PerformanceConfig(
+    graph_cache_size=_env_int("GRAPH_CACHE_SIZE", 32),
+    checkpoint_backend=_env_str("CHECKPOINT_BACKEND", "sqlite"),
+    checkpoint_db_path=_env_str("CHECKPOINT_DB_PATH", "data/checkpoints.sqlite"),
+    history_context_fraction=_env_float("HISTORY_CONTEXT_FRACTION", 0.75),
+    history_summary_cache_size=_env_int("HISTORY_SUMMARY_CACHE_SIZE", 1024),
+    tool_max_workers=_env_int("TOOL_MAX_WORKERS", 16),
+    tool_concurrency_limit=_env_int("TOOL_CONCURRENCY_LIMIT", 4),
+    tool_concurrency_limits=_env_limits("TOOL_CONCURRENCY_LIMITS"),
+    tool_timeout=_env_float("TOOL_TIMEOUT", 30.0),
+    response_cache_db_path=_env_str("RESPONSE_CACHE_DB_PATH", "data/response_cache.sqlite"),
+    response_cache_ttl=_env_float("RESPONSE_CACHE_TTL", 3600.0),
+    response_cache_max_entries=_env_int("RESPONSE_CACHE_MAX_ENTRIES", 5000),
+    response_cache_similarity_threshold=_env_float("RESPONSE_CACHE_SIMILARITY_THRESHOLD", 0.92),
+    response_cache_embedding_model=_env_str("RESPONSE_CACHE_EMBEDDING_MODEL", ""),
+    response_cache_context_turns=_env_int("RESPONSE_CACHE_CONTEXT_TURNS", 1),
+    search_cache_ttl=_env_float("SEARCH_CACHE_TTL", 900.0),
+    search_cache_max_entries=_env_int("SEARCH_CACHE_MAX_ENTRIES", 1024),
+    search_cache_disk_path=_env_str("SEARCH_CACHE_DISK_PATH", ""),
+    retrieval_backend=_env_str("RETRIEVAL_BACKEND", "qdrant"),
+    retrieval_index_path=_env_str("RETRIEVAL_INDEX_PATH", "data/dnd_index"),
+    retrieval_embedder=_env_str("RETRIEVAL_EMBEDDER", "sentence-transformers"),
+    retrieval_embedding_model=_env_str(
+        "RETRIEVAL_EMBEDDING_MODEL", "sentence-transformers/all-mpnet-base-v2"
+    ),
+    retrieval_token_budget=_env_int("RETRIEVAL_TOKEN_BUDGET", 1200),
+    retrieval_candidates=_env_int("RETRIEVAL_CANDIDATES", 20),
+    retrieval_rrf_k=_env_int("RETRIEVAL_RRF_K", 60),
+    retrieval_reranker_model=_env_str("RETRIEVAL_RERANKER_MODEL", ""),
+    embedding_cache_max_entries=_env_int("EMBEDDING_CACHE_MAX_ENTRIES", 4096),
+    embedding_cache_disk_path=_env_str("EMBEDDING_CACHE_DISK_PATH", ""),
+    embedding_batch_window=_env_float("EMBEDDING_BATCH_WINDOW", 0.01),
+    embedding_max_batch=_env_int("EMBEDDING_MAX_BATCH", 32),
+    ingest_chunk_size=_env_int("INGEST_CHUNK_SIZE", 1000),
+    ingest_chunk_overlap=_env_int("INGEST_CHUNK_OVERLAP", 200),
+    ingest_batch_size=_env_int("INGEST_BATCH_SIZE", 64),
+    ingest_workers=_env_int("INGEST_WORKERS", 4),
+    ingest_manifest_path=_env_str("INGEST_MANIFEST_PATH", "data/ingest_manifest.sqlite"),
+    trace_sinks=_env_str("TRACE_SINKS", "memory"),
+    trace_buffer_size=_env_int("TRACE_BUFFER_SIZE", 500),
+    trace_jsonl_path=_env_str("TRACE_JSONL_PATH", "data/traces.jsonl"),
+    trace_flush_interval=_env_float("TRACE_FLUSH_INTERVAL", 1.0),
+    trace_prometheus_port=_env_int("TRACE_PROMETHEUS_PORT", 0),
+    usage_db_path=_env_str("USAGE_DB_PATH", "data/usage.sqlite"),
+    usage_flush_interval=_env_float("USAGE_FLUSH_INTERVAL", 1.0),
+    cost_budget_daily=_env_float("COST_BUDGET_DAILY", 0.0),
+    cost_budgets=_env_limits("COST_BUDGETS", float),
+    cost_budget_action=_env_str("COST_BUDGET_ACTION", "downgrade"),
+    cost_budget_fallback_model=_env_str("COST_BUDGET_FALLBACK_MODEL", ""),
+    job_max_concurrency=_env_int("JOB_MAX_CONCURRENCY", 8),
+    job_per_user_limit=_env_int("JOB_PER_USER_LIMIT", 1),
+    job_max_queued_per_user=_env_int("JOB_MAX_QUEUED_PER_USER", 5),
+    job_retention=_env_float("JOB_RETENTION", 3600.0),
+    session_max_count=_env_int("SESSION_MAX_COUNT", 8),
+    session_idle_ttl=_env_float("SESSION_IDLE_TTL", 3600.0),
+    session_max_messages=_env_int("SESSION_MAX_MESSAGES", 500),
+    session_page_size=_env_int("SESSION_PAGE_SIZE", 50),
+    chat_window_size=_env_int("CHAT_WINDOW_SIZE", 20),
+    chat_render_cache_size=_env_int("CHAT_RENDER_CACHE_SIZE", 1024),
+    diagram_cache_dir=_env_str("DIAGRAM_CACHE_DIR", "data/diagrams"),
+    storage_backend=os.getenv("STORAGE_BACKEND", "sqlite"),
+    storage_db_path=_env_str("STORAGE_DB_PATH", "data/storage.sqlite"),
+    storage_batch_size=_env_int("STORAGE_BATCH_SIZE", 50),
+    storage_flush_interval=_env_float("STORAGE_FLUSH_INTERVAL", 1.0),
+    intent_router=_env_str("INTENT_ROUTER", "heuristic"),
+)
@@ -2,17 +2,28 @@ from dataclasses import dataclass
 from typing import Dict, List
 import streamlit as st
 from config.agent_config import AgentConfig
+from utils.storage import get_storage
 
 @dataclass
 class UserAgent(AgentConfig):
     pass
 
 def save_user_agent(agent: UserAgent):
-    if "user_agents" not in st.session_state:
-        st.session_state.user_agents = {}
-    st.session_state.user_agents[agent.name] = agent
+    user_agents = get_user_agents()
+    # Editing an agent replaces its config, so drop the stale compiled graph
+    previous = user_agents.get(agent.name)
+    if previous is not None:
+        from agents.graph_cache import invalidate_agent
+        invalidate_agent(previous)
+    user_agents[agent.name] = agent
+    storage = get_storage()
+    if storage is not None and st.session_state.get("username"):
+        storage.save_agent(st.session_state.username, agent)
 
 def get_user_agents() -> Dict[str, UserAgent]:
     if "user_agents" not in st.session_state:
-        st.session_state.user_agents = {}
+        # Loaded once per browser session; saves write through to storage
+        storage = get_storage()
+        username = st.session_state.get("username")
+        st.session_state.user_agents = storage.get_agents(username) if storage is not None and username else {}
     return st.session_state.user_agents 
\ No newline at end of file
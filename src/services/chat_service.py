@@ -0,0 +1,201 @@
+import asyncio
+import dataclasses
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+from agents.graph_cache import GraphCache, graph_cache
+from agents.streaming import StreamEvent
+from langchain_core.messages import AIMessage, HumanMessage
+from config.agent_config import AgentConfig
+from config.performance_config import PERFORMANCE_CONFIG
+from utils.cost_ledger import CostLedger, budget_fallback_model, format_dollars, get_cost_ledger
+from utils.event_loop import iterate_async
+from utils.response_cache import context_key, get_response_cache
+from utils.storage import StoredMessage, get_storage
+
+@dataclass
+class TurnRequest:
+    """One user message to an agent"""
+    user: str
+    agent_config: AgentConfig
+    thread_id: str
+    prompt: str
+    # Earlier {"role", "content"} messages, used to scope cached answers
+    history: Sequence[Dict[str, str]] = ()
+
+@dataclass
+class TurnResult:
+    """Outcome of a chat turn"""
+    answer: str
+    model_id: str
+    cache_tier: Optional[str] = None  # "exact" or "semantic" when served from cache
+    refused: bool = False
+    collected_info: List[str] = field(default_factory=list)
+    trace: Optional[Dict[str, Any]] = None  # total_ms, tokens, cost, per-step breakdown and route
+
+def summarize_trace(trace) -> Dict[str, Any]:
+    """Compact, JSON-friendly summary of a turn's trace"""
+    usage = CostLedger.turn_usage(trace).values()
+    return {
+        "total_ms": trace.duration * 1000,
+        "tokens": sum(row["prompt_tokens"] + row["completion_tokens"] for row in usage),
+        "cost": sum(row["cost"] for row in usage),
+        "steps": trace.breakdown(),
+        "route": trace.route,
+    }
+
+class ChatService:
+    """
+    The chat flow without any UI: response cache, budgets, the agent run and
+    cache write-back. The Streamlit view renders its events; load tests, the
+    job queue and the API call it directly.
+
+    astream_turn yields StreamEvents (tokens, tool progress and "notice"
+    captions) and ends with a "final" event whose result is a TurnResult.
+    Finished turns are saved to the thread in storage, if it's enabled.
+    """
+
+    def __init__(self, agents: GraphCache = None):
+        self.agents = agents if agents is not None else graph_cache
+
+    def _run_config(self, request: TurnRequest, agent_config: AgentConfig) -> Dict[str, Any]:
+        # The checkpointer restores earlier turns from the thread
+        return {
+            "configurable": {
+                "thread_id": request.thread_id
+            },
+            "metadata": {
+                "user": request.user,
+                "agent_type": agent_config.agent_type,
+                "model": agent_config.model_id,
+                "temperature": agent_config.temperature
+            }
+        }
+
+    async def astream_turn(self, request: TurnRequest) -> AsyncIterator[StreamEvent]:
+        """Run one turn, yielding progress events and a final TurnResult"""
+        async for event in self._astream_turn(request):
+            if event.kind == "final":
+                await asyncio.to_thread(self._save_turn, request, event.result)
+            yield event
+
+    def _save_turn(self, request: TurnRequest, result: TurnResult):
+        storage = get_storage()
+        if storage is not None:
+            storage.append_messages(request.thread_id, [
+                StoredMessage("user", request.prompt),
+                StoredMessage("assistant", result.answer, result.trace),
+            ])
+
+    def _restore_thread(self, agent_instance, config: Dict[str, Any], thread_id: str):
+        """
+        Rebuild a thread's checkpoint from storage when the checkpointer has
+        never seen it, e.g. after a restart with the memory backend or on a
+        replica with its own checkpoint file, so the model remembers the
+        conversation the user is shown
+        """
+        storage = get_storage()
+        if storage is None:
+            return
+
+        def load_messages():
+            stored = storage.get_messages(thread_id, PERFORMANCE_CONFIG.session_max_messages)
+            return [
+                HumanMessage(content=message.content) if message.role == "user" else AIMessage(content=message.content)
+                for message in stored
+            ]
+
+        agent_instance.restore_thread(config, load_messages)
+
+    async def _astream_turn(self, request: TurnRequest) -> AsyncIterator[StreamEvent]:
+        agent_config = request.agent_config
+        agent_instance, _ = self.agents.get(agent_config)
+        config = self._run_config(request, agent_config)
+        await asyncio.to_thread(self._restore_thread, agent_instance, config, request.thread_id)
+
+        # Serve repeated prompts from the response cache when the agent opts in
+        cache = get_response_cache() if agent_config.cache_responses else None
+        cache_context = context_key(request.history, PERFORMANCE_CONFIG.response_cache_context_turns)
+        cache_hit = None
+        if cache:
+            cache_hit = await asyncio.to_thread(
+                cache.lookup, agent_config.cache_key(), request.prompt, cache_context
+            )
+
+        if cache_hit:
+            # Keep the checkpointed thread in sync with what the user sees
+            await asyncio.to_thread(agent_instance.record_turn, config, request.prompt, cache_hit.response)
+            yield StreamEvent(kind="notice", content=f"⚡ Answered from cache ({cache_hit.tier} match)")
+            yield StreamEvent(kind="final", result=TurnResult(
+                answer=cache_hit.response, model_id=agent_config.model_id, cache_tier=cache_hit.tier
+            ))
+            return
+
+        # Cached answers are free, so budgets only apply to real runs
+        budget_action = None
+        if PERFORMANCE_CONFIG.usage_db_path:
+            budget_action = await asyncio.to_thread(get_cost_ledger().check_budget, request.user)
+        fallback_model = None
+        if budget_action == "downgrade":
+            fallback_model = budget_fallback_model(agent_config.model_id)
+            if fallback_model is None:
+                # Re-running on an equally priced model wouldn't save anything
+                budget_action = "refuse"
+        if budget_action == "refuse":
+            budget = get_cost_ledger().budget(request.user)
+            yield StreamEvent(kind="final", result=TurnResult(
+                answer=f"💸 You've used your daily budget of {format_dollars(budget)}. Please try again tomorrow.",
+                model_id=agent_config.model_id,
+                refused=True,
+            ))
+            return
+        if budget_action == "downgrade":
+            # Same thread, cheaper model
+            agent_config = dataclasses.replace(agent_config, model_id=fallback_model)
+            agent_instance, _ = self.agents.get(agent_config)
+            config = self._run_config(request, agent_config)
+            yield StreamEvent(kind="notice", content=f"💸 Daily budget reached, answering with {agent_config.model_id}")
+
+        # Only the new message is sent; history comes from the checkpoint
+        inputs = {
+            "messages": [("user", request.prompt)],
+            "collected_info": []  # Reset collected_info for advanced_react
+        }
+        state, trace = {}, None
+        async for event in agent_instance.astream(inputs, config):
+            if event.kind == "final":
+                state, trace = event.state, event.trace
+            else:
+                yield event
+
+        answer = state["messages"][-1].content
+        if cache:
+            await asyncio.to_thread(cache.store, agent_config.cache_key(), request.prompt, answer, cache_context)
+        yield StreamEvent(kind="final", state=state, trace=trace, result=TurnResult(
+            answer=answer,
+            model_id=agent_config.model_id,
+            collected_info=list(state.get("collected_info", [])),
+            trace=summarize_trace(trace) if trace is not None else None,
+        ))
+
+    async def arun_turn(self, request: TurnRequest) -> TurnResult:
+        """Run one turn to completion"""
+        result = None
+        async for event in self.astream_turn(request):
+            if event.kind == "final":
+                result = event.result
+        return result
+
+    def stream_turn(self, request: TurnRequest) -> Iterator[StreamEvent]:
+        """Sync version of astream_turn; the run happens on the shared background loop"""
+        return iterate_async(self.astream_turn(request))
+
+    def run_turn(self, request: TurnRequest) -> TurnResult:
+        """Sync version of arun_turn"""
+        result = None
+        for event in self.stream_turn(request):
+            if event.kind == "final":
+                result = event.result
+        return result
+
+# Shared by every Streamlit session in the process
+chat_service = ChatService()
@@ -0,0 +1,218 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterator, List, Optional
+from agents.streaming import StreamEvent
+from config.performance_config import PERFORMANCE_CONFIG
+from utils.event_loop import get_event_loop
+from .chat_service import ChatService, TurnRequest, chat_service
+
+# Job statuses; the last three are final
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+@dataclass
+class Job:
+    """A chat turn submitted to the job queue and the events it has produced"""
+    id: str
+    request: TurnRequest
+    status: str = QUEUED
+    events: List[StreamEvent] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def result(self):
+        """The TurnResult, once the job is done"""
+        return self.events[-1].result if self.events and self.events[-1].kind == "final" else None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+class JobQueue:
+    """
+    Runs chat turns on the background event loop, outside the Streamlit
+    script thread, so a rerun or a slow turn doesn't block or lose work.
+
+    At most max_concurrency turns run at once and each user gets at most
+    per_user_limit of them. Waiting jobs are picked round-robin across
+    users, so one user queueing many turns can't starve the others.
+    Finished jobs are kept for retention seconds so a rerun can pick up the
+    result.
+    """
+
+    def __init__(self, service: ChatService, max_concurrency: int, per_user_limit: int,
+                 max_queued_per_user: int, retention: float):
+        self.service = service
+        self.max_concurrency = max_concurrency
+        self.per_user_limit = per_user_limit
+        self.max_queued_per_user = max_queued_per_user
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+        self._waiting: Dict[str, Deque[Job]] = defaultdict(deque)
+        self._users: Deque[str] = deque()  # users with waiting jobs, in round-robin order
+        self._running: Dict[str, int] = defaultdict(int)
+        self._futures = {}
+        # Reentrant: a future that is already done runs its done callback,
+        # and so _on_done, right inside _dispatch while the lock is held
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+
+    def submit(self, request: TurnRequest) -> str:
+        """Queue a turn and return its job id"""
+        job = Job(id=uuid.uuid4().hex, request=request)
+        with self._lock:
+            self._evict_expired()
+            if len(self._waiting[request.user]) >= self.max_queued_per_user:
+                raise ValueError(f"Too many queued turns for {request.user}")
+            self._jobs[job.id] = job
+            if not self._waiting[request.user]:
+                self._users.append(request.user)
+            self._waiting[request.user].append(job)
+            self._dispatch()
+        return job.id
+
+    def _next_job(self) -> Optional[Job]:
+        """Next waiting job in round-robin user order; caller holds the lock"""
+        for _ in range(len(self._users)):
+            user = self._users[0]
+            self._users.rotate(-1)
+            if self._running[user] < self.per_user_limit:
+                job = self._waiting[user].popleft()
+                if not self._waiting[user]:
+                    self._users.remove(user)
+                    del self._waiting[user]
+                return job
+        return None
+
+    def _dispatch(self):
+        """Start waiting jobs while there is capacity; caller holds the lock"""
+        while sum(self._running.values()) < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                return
+            job.status = RUNNING
+            self._running[job.request.user] += 1
+            future = asyncio.run_coroutine_threadsafe(self._run(job), get_event_loop())
+            self._futures[job.id] = future
+            # Runs even if the job is cancelled before its coroutine starts
+            future.add_done_callback(lambda _, job=job: self._on_done(job))
+
+    async def _run(self, job: Job):
+        try:
+            async for event in self.service.astream_turn(job.request):
+                with self._changed:
+                    job.events.append(event)
+                    self._changed.notify_all()
+            self._finish(job, DONE)
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, f"{type(e).__name__}: {e}")
+
+    def _finish(self, job: Job, status: str, error: str = None):
+        with self._changed:
+            if not job.finished:
+                job.status, job.error, job.finished_at = status, error, time.time()
+            self._changed.notify_all()
+
+    def _on_done(self, job: Job):
+        self._finish(job, CANCELLED)
+        with self._lock:
+            self._futures.pop(job.id, None)
+            self._running[job.request.user] -= 1
+            if not self._running[job.request.user]:
+                del self._running[job.request.user]
+            self._dispatch()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a waiting or running job; False if it had already finished"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            if job.status == QUEUED:
+                user = job.request.user
+                self._waiting[user].remove(job)
+                if not self._waiting[user]:
+                    self._users.remove(user)
+                    del self._waiting[user]
+                job.status, job.finished_at = CANCELLED, time.time()
+                self._changed.notify_all()
+                return True
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id: str) -> int:
+        """How many of the user's own jobs are ahead of this one; 0 once running"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                return 0
+            return list(self._waiting[job.request.user]).index(job) + 1
+
+    def follow(self, job_id: str, start: int = 0, timeout: float = None) -> Iterator[StreamEvent]:
+        """Yield a job's events from index start as they arrive, until it finishes"""
+        index = start
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                while index >= len(job.events) and not job.finished:
+                    remaining = deadline - time.monotonic() if deadline else None
+                    if remaining is not None and remaining <= 0:
+                        return
+                    self._changed.wait(remaining)
+                events = job.events[index:]
+                finished = job.finished
+            yield from events
+            index += len(events)
+            if finished and index >= len(job.events):
+                return
+
+    def _evict_expired(self):
+        """Forget jobs that finished more than retention seconds ago; caller holds the lock"""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of running and waiting jobs"""
+        with self._lock:
+            return {
+                "running": sum(self._running.values()),
+                "waiting": sum(len(jobs) for jobs in self._waiting.values()),
+                "retained": len(self._jobs),
+            }
+
+_job_queue = None
+_queue_lock = threading.Lock()
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue"""
+    global _job_queue
+    with _queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                chat_service,
+                max_concurrency=PERFORMANCE_CONFIG.job_max_concurrency,
+                per_user_limit=PERFORMANCE_CONFIG.job_per_user_limit,
+                max_queued_per_user=PERFORMANCE_CONFIG.job_max_queued_per_user,
+                retention=PERFORMANCE_CONFIG.job_retention,
+            )
+        return _job_queue
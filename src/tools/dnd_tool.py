@@ -1,52 +1,90 @@
-from langchain_community.vectorstores import Qdrant
+from functools import lru_cache
 from langchain.agents import Tool
-from qdrant_client import QdrantClient
-from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
 from config.environment import get_env_variable
+from langchain_core.documents import Document
+from config.performance_config import PERFORMANCE_CONFIG
+from .embedders import create_embeddings
+from .local_vector_store import LocalVectorStore
+
+COLLECTION_NAME = "DnD_BasicRules_2018.txt"
 
 def initialize_qdrant():
+    from qdrant_client import QdrantClient
+
     # Set up Qdrant with your existing collection
     client = QdrantClient(
         url=get_env_variable('QDRANT_URL'),
         api_key=get_env_variable('QDRANT_API_KEY'),
     )
 
-    # Get the HuggingFace API key
-    huggingface_api_key = get_env_variable('HUGGINGFACE_API_KEY')
-    if huggingface_api_key is None:
-        raise ValueError("HUGGINGFACE_API_KEY is not set in environment variables or secrets")
-
     # Initialize remote embeddings
-    embeddings = HuggingFaceInferenceAPIEmbeddings(
-        api_key=huggingface_api_key, model_name="sentence-transformers/all-mpnet-base-v2"
-    )
+    embeddings = create_embeddings("huggingface-api", PERFORMANCE_CONFIG.retrieval_embedding_model)
 
     return client, embeddings
 
-# Initialize the Qdrant retriever tool
-qdrant, embeddings = initialize_qdrant()
+def initialize_local_store():
+    """Open the on-disk index built from the rules text"""
+    embeddings = create_embeddings(
+        PERFORMANCE_CONFIG.retrieval_embedder, PERFORMANCE_CONFIG.retrieval_embedding_model
+    )
+    return LocalVectorStore(PERFORMANCE_CONFIG.retrieval_index_path, embeddings)
+
+@lru_cache(maxsize=1)
+def get_vector_store():
+    """Build the configured vector store once per process, on first use"""
+    if PERFORMANCE_CONFIG.retrieval_backend == "local":
+        return initialize_local_store()
+    if PERFORMANCE_CONFIG.retrieval_backend != "qdrant":
+        raise ValueError(f"Unknown retrieval backend: {PERFORMANCE_CONFIG.retrieval_backend}")
 
-# Set up Qdrant with your existing collection
-qdrant_retriever = Qdrant(
-    client=qdrant,
-    collection_name="DnD_BasicRules_2018.txt",  # Replace with your collection name
-    embeddings=embeddings
-)
+    from langchain_community.vectorstores import Qdrant
+    qdrant, embeddings = initialize_qdrant()
+
+    # Set up Qdrant with your existing collection
+    return Qdrant(
+        client=qdrant,
+        collection_name=COLLECTION_NAME,
+        embeddings=embeddings
+    )
+
+def load_keyword_index(vector_store):
+    """Build the BM25 index over the same chunks as the vector store"""
+    from .hybrid_retriever import BM25Index
+    if isinstance(vector_store, LocalVectorStore):
+        chunks = vector_store.chunks
+    else:
+        # Qdrant chunks are mirrored in the ingestion manifest
+        from .ingest import load_manifest_chunks
+        chunks = load_manifest_chunks(PERFORMANCE_CONFIG.ingest_manifest_path, COLLECTION_NAME)
+    return BM25Index([Document(page_content=chunk["text"], metadata=chunk["metadata"]) for chunk in chunks])
+
+@lru_cache(maxsize=1)
+def get_retriever():
+    """Hybrid keyword and vector retriever over the rules"""
+    from .hybrid_retriever import CrossEncoderReranker, HybridRetriever
+    vector_store = get_vector_store()
+    reranker_model = PERFORMANCE_CONFIG.retrieval_reranker_model
+    return HybridRetriever(
+        vector_store,
+        keyword_index=load_keyword_index(vector_store),
+        candidates=PERFORMANCE_CONFIG.retrieval_candidates,
+        rrf_k=PERFORMANCE_CONFIG.retrieval_rrf_k,
+        reranker=CrossEncoderReranker(reranker_model) if reranker_model else None,
+    )
 
 def get_relevant_document(name: str) -> str:
-    results = qdrant_retriever.similarity_search(query=name, k=5)
+    results = get_retriever().retrieve(name, PERFORMANCE_CONFIG.retrieval_token_budget)
     
     total_content = "\n\nBelow is content related to the user's query: \n\n"
-    chunk_count = 0
     for result in results:
-        chunk_count += 1
-        if chunk_count > 4:
-            break
         total_content += result.page_content + "\n"
     return total_content
 
-dnd_rules_tool = Tool(
-    name="Get Relevant document",
-    func=get_relevant_document,
-    description="Useful for helping answer queries about DND or Dungeon and Dragons."
-) 
\ No newline at end of file
+def create_dnd_rules_tool():
+    """Create the DnD rules retrieval tool"""
+    get_retriever()
+    return Tool(
+        name="Get Relevant document",
+        func=get_relevant_document,
+        description="Useful for helping answer queries about DND or Dungeon and Dragons."
+    )
@@ -0,0 +1,59 @@
+import hashlib
+import re
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+class HashingEmbeddings(Embeddings):
+    """
+    Dependency-free embeddings using signed feature hashing of word unigrams
+    and bigrams. Deterministic across processes, which makes it suitable for
+    tests and offline use; quality is far below a trained model.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self.model_name = f"hashing-{dimensions}"
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = re.findall(r"\w+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.md5(feature.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+def _create_model_embeddings(embedder: str, model_name: str) -> Embeddings:
+    """Create an uncached model-backed embeddings backend"""
+    if embedder == "sentence-transformers":
+        # Runs the model locally; needs the sentence-transformers package
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    if embedder == "huggingface-api":
+        from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
+        from config.environment import get_env_variable
+        huggingface_api_key = get_env_variable('HUGGINGFACE_API_KEY')
+        if huggingface_api_key is None:
+            raise ValueError("HUGGINGFACE_API_KEY is not set in environment variables or secrets")
+        return HuggingFaceInferenceAPIEmbeddings(api_key=huggingface_api_key, model_name=model_name)
+    raise ValueError(f"Unknown embedder: {embedder}")
+
+def create_embeddings(embedder: str, model_name: str, cached: bool = True) -> Embeddings:
+    """Create an embeddings backend by name, behind the embedding cache"""
+    if embedder == "hashing":
+        # Cheaper to recompute than to look up
+        return HashingEmbeddings()
+    embeddings = _create_model_embeddings(embedder, model_name)
+    if not cached:
+        return embeddings
+    from .embedding_cache import cached_embeddings
+    return cached_embeddings(embeddings, f"{embedder}:{model_name}")
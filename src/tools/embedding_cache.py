@@ -0,0 +1,183 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config.performance_config import PERFORMANCE_CONFIG
+
+def text_key(model_name: str, text: str) -> str:
+    """Cache key for a text under a given embedding model"""
+    return hashlib.sha256(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+
+class _MicroBatcher:
+    """
+    Collects query embeddings that arrive within a short window and sends
+    them upstream as one embed_documents call. Only valid for models that
+    embed queries and documents the same way, which holds for the
+    sentence-transformers models used here.
+    """
+
+    def __init__(self, embeddings: Embeddings, window: float, max_batch: int):
+        self.embeddings = embeddings
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for the next batch"""
+        future = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            else:
+                batch = None
+                if self._flush_timer is None:
+                    self._flush_timer = threading.Timer(self.window, self._flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+        if batch:
+            self._run(batch)
+        return future
+
+    def _take(self) -> List[tuple]:
+        """Take the pending batch; caller holds the lock"""
+        batch, self._pending = self._pending, []
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch: List[tuple]):
+        """Embed a batch, deduplicating texts, and resolve every waiter"""
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(unique, self.embeddings.embed_documents(unique)))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for text, future in batch:
+            future.set_result(vectors[text])
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-memory LRU, an optional SQLite store and
+    micro-batching of concurrent query embeddings.
+
+    Entries are keyed by model name and a hash of the text, so one disk store
+    can be shared by several models. Any LangChain vectorstore can take this
+    in place of the wrapped embeddings.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, max_entries: int = 4096,
+                 disk_path: str = None, batch_window: float = 0.0, max_batch: int = 32):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._batcher = _MicroBatcher(embeddings, batch_window, max_batch) if batch_window > 0 else None
+        self.hits = 0
+        self.misses = 0
+
+        self._disk = None
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+
+    def _get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Look up cached vectors in memory, then on disk"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            missing = [key for key in keys if key not in found]
+            if self._disk is not None and missing:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._disk.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+                    self._remember(key, found[key])
+        return found
+
+    def _put_many(self, items: Dict[str, List[float]]):
+        """Store vectors in memory and on disk"""
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._disk is not None:
+                self._disk.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+                )
+                self._disk.commit()
+
+    def _remember(self, key: str, vector: List[float]):
+        """Insert into the in-memory LRU; caller holds the lock"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [text_key(self.model_name, text) for text in texts]
+        found = self._get_many(keys)
+        missing = list(dict.fromkeys(
+            text for text, key in zip(texts, keys) if key not in found
+        ))
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            vectors = self.embeddings.embed_documents(missing)
+            new_items = {text_key(self.model_name, text): vector for text, vector in zip(missing, vectors)}
+            self._put_many(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_key(self.model_name, text)
+        found = self._get_many([key])
+        if key in found:
+            self.hits += 1
+            return found[key]
+
+        self.misses += 1
+        if self._batcher is not None:
+            vector = self._batcher.submit(text).result()
+        else:
+            vector = self.embeddings.embed_query(text)
+        self._put_many({key: vector})
+        return vector
+
+def cached_embeddings(embeddings: Embeddings, model_name: str) -> CachedEmbeddings:
+    """Wrap embeddings with the process-wide cache settings"""
+    return CachedEmbeddings(
+        embeddings,
+        model_name=model_name,
+        max_entries=PERFORMANCE_CONFIG.embedding_cache_max_entries,
+        disk_path=PERFORMANCE_CONFIG.embedding_cache_disk_path or None,
+        batch_window=PERFORMANCE_CONFIG.embedding_batch_window,
+        max_batch=PERFORMANCE_CONFIG.embedding_max_batch,
+    )
@@ -0,0 +1,126 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from utils.tokens import count_tokens
+from .local_vector_store import content_hash
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens used by the keyword index"""
+    return re.findall(r"\w+", text.lower())
+
+class BM25Index:
+    """
+    In-process inverted index scored with Okapi BM25.
+
+    The document-side part of each term score is precomputed per posting,
+    so a query is a handful of numpy scatter-adds over the postings of its
+    terms rather than a pass over every chunk.
+    """
+
+    def __init__(self, documents: Sequence[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = list(documents)
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths = np.zeros(len(self.documents), dtype=np.float32)
+        for doc_id, document in enumerate(self.documents):
+            terms = Counter(tokenize(document.page_content))
+            lengths[doc_id] = sum(terms.values())
+            for term, tf in terms.items():
+                postings[term].append((doc_id, tf))
+
+        average_length = float(lengths.mean()) if len(lengths) else 0.0
+        count = len(self.documents)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, entries in postings.items():
+            ids = np.fromiter((doc_id for doc_id, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / (average_length or 1.0))
+            self._postings[term] = (ids, idf * tfs * (k1 + 1) / (tfs + norm))
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """Top-k documents by BM25 score"""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        matched = False
+        for term in set(tokenize(query)):
+            if term in self._postings:
+                ids, impacts = self._postings[term]
+                scores[ids] += impacts
+                matched = True
+        if not matched:
+            return []
+        k = min(k, int(np.count_nonzero(scores)))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], k: int = 60) -> List[Document]:
+    """Merge ranked lists, scoring each document by the sum of 1 / (k + rank)"""
+    scores: Dict[str, float] = defaultdict(float)
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            key = content_hash(document.page_content)
+            scores[key] += 1.0 / (k + rank + 1)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+class CrossEncoderReranker:
+    """Rerank candidates with a sentence-transformers cross-encoder"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name)
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if not documents:
+            return documents
+        scores = self.model.predict([(query, document.page_content) for document in documents])
+        order = np.argsort(-np.asarray(scores))
+        return [documents[i] for i in order]
+
+class HybridRetriever:
+    """
+    Combines vector similarity with BM25 keyword matches.
+
+    Both retrievers contribute a candidate list, the lists are merged with
+    reciprocal rank fusion and optionally reranked, and the best chunks are
+    returned until the token budget is spent.
+    """
+
+    def __init__(self, vector_store, keyword_index: Optional[BM25Index] = None,
+                 candidates: int = 20, rrf_k: int = 60, reranker=None):
+        self.vector_store = vector_store
+        self.keyword_index = keyword_index
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+
+    def rank(self, query: str) -> List[Document]:
+        """All fused candidates for a query, best first"""
+        rankings = [self.vector_store.similarity_search(query, k=self.candidates)]
+        if self.keyword_index is not None and len(self.keyword_index):
+            rankings.append([doc for doc, _ in self.keyword_index.search(query, self.candidates)])
+        documents = reciprocal_rank_fusion(rankings, self.rrf_k)
+        if self.reranker is not None:
+            documents = self.reranker.rerank(query, documents)
+        return documents
+
+    def retrieve(self, query: str, token_budget: int) -> List[Document]:
+        """Best chunks for a query that fit within the token budget"""
+        selected, used = [], 0
+        for document in self.rank(query):
+            tokens = count_tokens(document.page_content)
+            # Always return the top chunk, even if it alone exceeds the budget
+            if selected and used + tokens > token_budget:
+                continue
+            selected.append(document)
+            used += tokens
+            if used >= token_budget:
+                break
+        return selected
@@ -0,0 +1,295 @@
+"""
+Bulk ingestion pipeline for the retrieval collections.
+
+Streams text or PDF sources, chunks them, embeds chunks in batches on a
+bounded worker pool and upserts them to the configured vector store.
+Chunks whose content hash is already stored are skipped, so re-running
+over the same sources only embeds what changed.
+
+Usage (from src/):
+    python -m tools.ingest DnD_BasicRules_2018.txt --backend local
+    python -m tools.ingest rules/ --backend qdrant --collection DnD_BasicRules_2018.txt
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
+from config.performance_config import PERFORMANCE_CONFIG
+from .embedders import create_embeddings
+from .local_vector_store import LocalVectorStore, content_hash
+
+# Characters read per step when streaming plain text
+READ_BLOCK_SIZE = 64 * 1024
+
+# Separators tried in order when choosing where a chunk ends
+SEPARATORS = ["\n\n", "\n", ". ", " "]
+
+def iter_source_files(paths: Iterable[str]) -> Iterator[str]:
+    """Expand files and directories into ingestible file paths"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith((".txt", ".md", ".pdf")):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def iter_segments(path: str) -> Iterator[str]:
+    """Stream a file as text segments without loading it whole"""
+    if path.lower().endswith(".pdf"):
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise ImportError("PDF ingestion requires the pypdf package") from e
+        for page in PdfReader(path).pages:
+            yield (page.extract_text() or "") + "\n\n"
+        return
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while block := f.read(READ_BLOCK_SIZE):
+            yield block
+
+def _split_point(text: str, chunk_size: int) -> int:
+    """Choose where to end a chunk, preferring natural boundaries"""
+    for separator in SEPARATORS:
+        index = text.rfind(separator, chunk_size // 2, chunk_size)
+        if index != -1:
+            return index + len(separator)
+    return chunk_size
+
+def iter_chunks(segments: Iterable[str], chunk_size: int, chunk_overlap: int) -> Iterator[str]:
+    """Chunk a stream of text segments with overlap between neighbours"""
+    buffer = ""
+    for segment in segments:
+        buffer += segment
+        while len(buffer) >= chunk_size:
+            end = _split_point(buffer, chunk_size)
+            chunk = buffer[:end].strip()
+            if chunk:
+                yield chunk
+            # Start the next chunk a little early, on a word boundary
+            start = max(end - chunk_overlap, 0)
+            space = buffer.find(" ", start, end)
+            buffer = buffer[space + 1 if chunk_overlap and space != -1 else end:]
+    if buffer.strip():
+        yield buffer.strip()
+
+class LocalSink:
+    """Writes chunks to a LocalVectorStore, flushing in large appends"""
+
+    def __init__(self, index_path: str, embeddings, flush_size: int = 5000):
+        self.store = LocalVectorStore(index_path, embeddings)
+        self.flush_size = flush_size
+        self._texts, self._vectors, self._metadatas = [], [], []
+
+    def existing_hashes(self) -> set:
+        return self.store.hashes()
+
+    def write(self, texts: List[str], vectors: List[List[float]], metadatas: List[dict]):
+        self._texts.extend(texts)
+        self._vectors.extend(vectors)
+        self._metadatas.extend(metadatas)
+        # Each flush writes a shard file and may merge it into older ones;
+        # larger flushes mean fewer small files and fewer merge rewrites
+        if len(self._texts) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if self._texts:
+            self.store.add_embeddings(self._texts, self._vectors, self._metadatas)
+            self._texts, self._vectors, self._metadatas = [], [], []
+
+class QdrantSink:
+    """
+    Upserts chunks to a Qdrant collection in bulk.
+
+    Point ids are derived from content hashes, so re-upserting is
+    idempotent. A local SQLite manifest records what has been ingested (and
+    the chunk text, for in-process keyword search) so resumes don't need to
+    scan the remote collection.
+    """
+
+    def __init__(self, collection: str, manifest_path: str):
+        from qdrant_client import QdrantClient
+        from config.environment import get_env_variable
+        self.client = QdrantClient(
+            url=get_env_variable('QDRANT_URL'),
+            api_key=get_env_variable('QDRANT_API_KEY'),
+        )
+        self.collection = collection
+        self.manifest = open_manifest(manifest_path)
+
+    def existing_hashes(self) -> set:
+        rows = self.manifest.execute(
+            "SELECT hash FROM chunks WHERE collection = ?", (self.collection,)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def _ensure_collection(self, dimensions: int):
+        from qdrant_client.models import Distance, VectorParams
+        if not self.client.collection_exists(self.collection):
+            self.client.create_collection(
+                self.collection, vectors_config=VectorParams(size=dimensions, distance=Distance.COSINE)
+            )
+
+    def write(self, texts: List[str], vectors: List[List[float]], metadatas: List[dict]):
+        from qdrant_client.models import PointStruct
+        self._ensure_collection(len(vectors[0]))
+        hashes = [content_hash(text) for text in texts]
+        # Payload keys match what langchain's Qdrant vectorstore reads back
+        self.client.upsert(
+            self.collection,
+            points=[
+                PointStruct(
+                    id=str(uuid.uuid5(uuid.NAMESPACE_URL, chunk_hash)),
+                    vector=vector,
+                    payload={"page_content": text, "metadata": metadata},
+                )
+                for chunk_hash, text, vector, metadata in zip(hashes, texts, vectors, metadatas)
+            ],
+        )
+        self.manifest.executemany(
+            "INSERT OR IGNORE INTO chunks (collection, hash, text, metadata) VALUES (?, ?, ?, ?)",
+            [(self.collection, chunk_hash, text, json.dumps(metadata))
+             for chunk_hash, text, metadata in zip(hashes, texts, metadatas)],
+        )
+        self.manifest.commit()
+
+    def flush(self):
+        pass
+
+def open_manifest(manifest_path: str) -> sqlite3.Connection:
+    """Open the ingestion manifest, creating it if needed"""
+    directory = os.path.dirname(manifest_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(manifest_path, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS chunks ("
+        "collection TEXT NOT NULL, hash TEXT NOT NULL, text TEXT NOT NULL, metadata TEXT NOT NULL, "
+        "PRIMARY KEY (collection, hash))"
+    )
+    return conn
+
+def load_manifest_chunks(manifest_path: str, collection: str) -> List[dict]:
+    """Chunks recorded for a collection, as dicts with text, metadata and hash"""
+    if not os.path.exists(manifest_path):
+        return []
+    conn = open_manifest(manifest_path)
+    try:
+        rows = conn.execute(
+            "SELECT hash, text, metadata FROM chunks WHERE collection = ?", (collection,)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{"text": text, "metadata": json.loads(metadata), "hash": chunk_hash}
+            for chunk_hash, text, metadata in rows]
+
+def iter_new_chunks(files: Iterable[str], chunk_size: int, chunk_overlap: int,
+                    existing: set, stats: dict) -> Iterator[Tuple[str, dict]]:
+    """Yield (text, metadata) for chunks not yet ingested"""
+    for path in files:
+        stats["docs"] += 1
+        for index, chunk in enumerate(iter_chunks(iter_segments(path), chunk_size, chunk_overlap)):
+            stats["chunks"] += 1
+            chunk_hash = content_hash(chunk)
+            if chunk_hash in existing:
+                stats["skipped"] += 1
+                continue
+            existing.add(chunk_hash)
+            yield chunk, {"source": os.path.basename(path), "chunk": index}
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Group an iterator into lists of batch_size"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def ingest(sources: List[str], sink, embeddings, chunk_size: int, chunk_overlap: int,
+           batch_size: int, workers: int, report_every: float = 5.0) -> dict:
+    """Run the pipeline and return throughput statistics"""
+    if not 0 <= chunk_overlap < chunk_size // 2:
+        raise ValueError("chunk_overlap must be less than half of chunk_size")
+    stats = {"docs": 0, "chunks": 0, "skipped": 0, "embedded": 0}
+    start = last_report = time.perf_counter()
+    chunks = iter_new_chunks(iter_source_files(sources), chunk_size, chunk_overlap,
+                             sink.existing_hashes(), stats)
+
+    def embed(batch):
+        texts = [text for text, _ in batch]
+        return texts, embeddings.embed_documents(texts), [metadata for _, metadata in batch]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for batch in iter_batches(chunks, batch_size):
+            pending.append(pool.submit(embed, batch))
+            # Bound in-flight batches so memory stays flat on large corpora
+            while len(pending) >= workers * 2 or (pending and pending[0].done()):
+                texts, vectors, metadatas = pending.pop(0).result()
+                sink.write(texts, vectors, metadatas)
+                stats["embedded"] += len(texts)
+            if time.perf_counter() - last_report >= report_every:
+                last_report = time.perf_counter()
+                _report(stats, last_report - start)
+        for future in pending:
+            texts, vectors, metadatas = future.result()
+            sink.write(texts, vectors, metadatas)
+            stats["embedded"] += len(texts)
+    sink.flush()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["docs_per_sec"] = stats["docs"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["chunks_per_sec"] = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+def _report(stats: dict, elapsed: float):
+    """Print a progress line"""
+    print(
+        f"{stats['docs']} docs, {stats['chunks']} chunks "
+        f"({stats['skipped']} unchanged, {stats['embedded']} embedded) in {elapsed:.1f}s: "
+        f"{stats['docs'] / elapsed:.2f} docs/sec, {stats['chunks'] / elapsed:.1f} chunks/sec",
+        file=sys.stderr,
+    )
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Ingest documents into a retrieval collection")
+    parser.add_argument("sources", nargs="+", help="Text, Markdown or PDF files, or directories")
+    parser.add_argument("--backend", choices=["local", "qdrant"], default=PERFORMANCE_CONFIG.retrieval_backend)
+    parser.add_argument("--index-path", default=PERFORMANCE_CONFIG.retrieval_index_path,
+                        help="Directory of the local index")
+    parser.add_argument("--collection", default="DnD_BasicRules_2018.txt", help="Qdrant collection name")
+    parser.add_argument("--manifest", default=PERFORMANCE_CONFIG.ingest_manifest_path,
+                        help="SQLite manifest of chunks ingested into Qdrant")
+    parser.add_argument("--embedder", default=PERFORMANCE_CONFIG.retrieval_embedder)
+    parser.add_argument("--embedding-model", default=PERFORMANCE_CONFIG.retrieval_embedding_model)
+    parser.add_argument("--chunk-size", type=int, default=PERFORMANCE_CONFIG.ingest_chunk_size)
+    parser.add_argument("--chunk-overlap", type=int, default=PERFORMANCE_CONFIG.ingest_chunk_overlap)
+    parser.add_argument("--batch-size", type=int, default=PERFORMANCE_CONFIG.ingest_batch_size)
+    parser.add_argument("--workers", type=int, default=PERFORMANCE_CONFIG.ingest_workers)
+    args = parser.parse_args(argv)
+
+    # Ingested chunks are unique, so the query-side cache would only add overhead
+    embeddings = create_embeddings(args.embedder, args.embedding_model, cached=False)
+    if args.backend == "local":
+        sink = LocalSink(args.index_path, embeddings)
+    else:
+        sink = QdrantSink(args.collection, args.manifest)
+
+    stats = ingest(args.sources, sink, embeddings, args.chunk_size, args.chunk_overlap,
+                   args.batch_size, args.workers)
+    _report(stats, stats["seconds"])
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
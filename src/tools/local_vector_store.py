@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+EMBEDDINGS_FILE = "embeddings.npy"  # single-file layout of older indexes, read as the first shard
+SHARD_PREFIX = "embeddings-"
+CHUNKS_FILE = "chunks.jsonl"
+META_FILE = "meta.json"
+
+def content_hash(text: str) -> str:
+    """Stable hash of a chunk's text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store that needs no network.
+
+    Normalized embeddings are kept in float32 .npy shards that are
+    memory-mapped on load, so opening a large index is cheap and pages are
+    shared between processes. Each append writes a new shard named by its
+    first row, and a shard is merged into the one before it once it grows
+    to half that one's size, so ingesting n chunks in batches rewrites
+    O(n log n) rows rather than O(n^2) and the shard count stays
+    logarithmic. Queries are a matrix-vector product per shard followed by
+    a partial sort for the top k.
+    """
+
+    def __init__(self, index_dir: str, embeddings: Embeddings):
+        self.index_dir = index_dir
+        self._embeddings = embeddings
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[int, np.ndarray]] = []  # (first row, rows), in row order
+        self._chunks: List[dict] = []
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embeddings
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _shard_name(self, start: int) -> str:
+        return f"{SHARD_PREFIX}{start:012d}.npy"
+
+    def _load(self):
+        """Memory-map the embedding shards and read chunk texts"""
+        if not os.path.exists(self._path(CHUNKS_FILE)):
+            return
+        with open(self._path(CHUNKS_FILE), encoding="utf-8") as f:
+            self._chunks = [json.loads(line) for line in f]
+        files = []
+        if os.path.exists(self._path(EMBEDDINGS_FILE)):
+            files.append((0, EMBEDDINGS_FILE))
+        for name in os.listdir(self.index_dir):
+            if name.startswith(SHARD_PREFIX) and name.endswith(".npy"):
+                files.append((int(name[len(SHARD_PREFIX):-len(".npy")]), name))
+        end = 0
+        for start, name in sorted(files):
+            rows = np.load(self._path(name), mmap_mode="r")
+            # A shard already covered by a merged one is left over from an
+            # interrupted merge; rows past the last chunk from an interrupted append
+            if start + len(rows) <= end or start > end:
+                continue
+            rows = rows[end - start:len(self._chunks) - start]
+            if len(rows):
+                self._shards.append((end, rows))
+                end += len(rows)
+
+    def _write_shard(self, start: int, rows: np.ndarray) -> np.ndarray:
+        """Write rows as the shard starting at start and memory-map it"""
+        path = self._path(self._shard_name(start))
+        # Write to a temp file and swap it in so readers never see a partial shard
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, rows)
+        os.replace(tmp_path, path)
+        return np.load(path, mmap_mode="r")
+
+    def _merge_shards(self, shards: List[Tuple[int, np.ndarray]]) -> List[Tuple[int, np.ndarray]]:
+        """Fold the newest shard into the previous one while it's at least half its size"""
+        shards = list(shards)
+        while len(shards) >= 2 and 2 * len(shards[-1][1]) >= len(shards[-2][1]):
+            (start, previous), (last_start, last) = shards[-2:]
+            shards[-2:] = [(start, self._write_shard(start, np.concatenate([previous, last])))]
+            os.remove(self._path(self._shard_name(last_start)))
+            if start == 0 and os.path.exists(self._path(EMBEDDINGS_FILE)):
+                # An older single-file index is now part of the first shard
+                os.remove(self._path(EMBEDDINGS_FILE))
+        return shards
+
+    def __len__(self):
+        return len(self._chunks)
+
+    @property
+    def chunks(self) -> List[dict]:
+        """Stored chunks as dicts with text, metadata and hash"""
+        return self._chunks
+
+    def hashes(self) -> set:
+        """Content hashes of every stored chunk"""
+        return {chunk["hash"] for chunk in self._chunks}
+
+    def add_embeddings(self, texts: List[str], vectors: np.ndarray,
+                       metadatas: Optional[List[dict]] = None) -> List[str]:
+        """Append precomputed embeddings and their texts to the index"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        metadatas = metadatas or [{} for _ in texts]
+        new_chunks = [
+            {"text": text, "metadata": metadata, "hash": content_hash(text)}
+            for text, metadata in zip(texts, metadatas)
+        ]
+
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            start = len(self._chunks)
+            shards = self._shards + [(start, self._write_shard(start, vectors))]
+            with open(self._path(CHUNKS_FILE), "a", encoding="utf-8") as f:
+                for chunk in new_chunks:
+                    f.write(json.dumps(chunk) + "\n")
+            self._chunks.extend(new_chunks)
+            # Swap in a new list so concurrent queries see a consistent set of shards
+            self._shards = self._merge_shards(shards)
+            with open(self._path(META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"dimensions": vectors.shape[1], "count": len(self._chunks),
+                           "shards": [self._shard_name(start) for start, _ in self._shards]}, f)
+        return [chunk["hash"] for chunk in new_chunks]
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = np.asarray(self._embeddings.embed_documents(texts), dtype=np.float32)
+        return self.add_embeddings(texts, vectors, metadatas)
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float],
+                                               k: int = 4) -> List[Tuple[Document, float]]:
+        """Top-k documents by cosine similarity to a query vector"""
+        shards = self._shards
+        if not shards:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = np.concatenate([rows @ query for _, rows in shards])
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(page_content=self._chunks[i]["text"], metadata=self._chunks[i]["metadata"]), float(scores[i]))
+            for i in top
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embeddings.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings,
+                   metadatas: Optional[List[dict]] = None, index_dir: str = None,
+                   **kwargs: Any) -> "LocalVectorStore":
+        if index_dir is None:
+            raise ValueError("index_dir is required for LocalVectorStore")
+        store = cls(index_dir, embedding)
+        store.add_texts(texts, metadatas)
+        return store
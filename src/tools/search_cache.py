@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+class _LeaderGone(Exception):
+    """The caller fetching a key was cancelled; waiting callers try again"""
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so equivalent queries share a cache entry"""
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+class SearchResultCache:
+    """
+    Bounded TTL cache for search results with in-flight request coalescing.
+
+    Results live in an in-memory LRU and, if disk_path is set, in a SQLite
+    file that survives restarts and is shared by processes on the same host.
+    Concurrent lookups for the same key while a fetch is in flight wait for
+    that fetch instead of issuing their own upstream call. Fetch errors are
+    shared with them, but a cancelled fetch is not: one user's Stop or tool
+    timeout hands the fetch to a waiting caller instead of failing its turn.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, disk_path: str = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._disk = None
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS search_results "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now - self.ttl:
+                self._memory.move_to_end(key)
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+            if self._disk is None:
+                return None
+            row = self._disk.execute(
+                "SELECT value, created_at FROM search_results WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def put(self, key: str, value: Any):
+        """Cache a value in memory and on disk"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO search_results (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), now),
+                )
+                self._disk.execute("DELETE FROM search_results WHERE created_at <= ?", (now - self.ttl,))
+                self._disk.commit()
+
+    def _remember(self, key: str, value: Any, created_at: float):
+        """Insert into the in-memory LRU; caller holds the lock"""
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """Get the in-flight future for a key and whether this caller must fetch"""
+        with self._lock:
+            if key in self._in_flight:
+                self.coalesced += 1
+                return self._in_flight[key], False
+            future = Future()
+            self._in_flight[key] = future
+            self.misses += 1
+            return future, True
+
+    def _settle(self, key: str, future: Future, value: Any = None, error: BaseException = None,
+                should_cache: Callable[[Any], bool] = None):
+        """Publish a fetch result to waiting callers and cache it"""
+        if error is None and (should_cache is None or should_cache(value)):
+            self.put(key, value)
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if error is None:
+            future.set_result(value)
+        elif isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            # Cancellation and interrupts belong to the fetching caller alone
+            future.set_exception(_LeaderGone())
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any],
+                     should_cache: Callable[[Any], bool] = None) -> Any:
+        """Return the cached value for key, fetching it at most once concurrently"""
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            future, leader = self._claim(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except _LeaderGone:
+                continue
+        try:
+            value = fetch()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value, should_cache=should_cache)
+        return value
+
+    async def aget_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                            should_cache: Callable[[Any], bool] = None) -> Any:
+        """Async version of get_or_fetch; coalesces with sync callers too"""
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            future, leader = self._claim(key)
+            if leader:
+                break
+            try:
+                # Shielded so a waiter's own cancellation doesn't cancel the shared future
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderGone:
+                continue
+        try:
+            value = await fetch()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value, should_cache=should_cache)
+        return value
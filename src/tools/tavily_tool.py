@@ -2,20 +2,70 @@ import os
 from langchain_community.tools import TavilySearchResults
 from langchain_community.utilities.tavily_search import TavilySearchAPIWrapper
 from config.environment import get_env_variable
-
-# Get the Tavily API key
-tavily_api_key = get_env_variable('TAVILY_API_KEY')
-if tavily_api_key is None:
-    raise ValueError("TAVILY_API_KEY is not set in environment variables or secrets")
-
-# Set the Tavily API key in the environment
-os.environ['TAVILY_API_KEY'] = tavily_api_key
+from config.performance_config import PERFORMANCE_CONFIG
+from .search_cache import SearchResultCache, normalize_query
 
 # Description for the Tavily tool
 tool_description = '''
 Searches internet for information using the tavily api. Best for generic information gathering.
 '''
 
-# Initialize the Tavily search tool
-search = TavilySearchAPIWrapper()
-tavily_tool = TavilySearchResults(api_wrapper=search, description=tool_description) 
\ No newline at end of file
+# Shared by every session, so repeated topics hit the API once per TTL
+search_cache = SearchResultCache(
+    max_entries=PERFORMANCE_CONFIG.search_cache_max_entries,
+    ttl=PERFORMANCE_CONFIG.search_cache_ttl,
+    disk_path=PERFORMANCE_CONFIG.search_cache_disk_path or None,
+)
+
+def _is_cacheable(result) -> bool:
+    """Errors come back as (repr(error), {}) and must not be cached"""
+    return not isinstance(result[0], str)
+
+class CachedTavilySearchResults(TavilySearchResults):
+    """
+    TavilySearchResults with the same name and schema, backed by the shared
+    search cache. Concurrent identical queries share one upstream call.
+    """
+
+    def _cache_key(self, query: str) -> str:
+        """Cache key covering the query and every option that changes results"""
+        return "|".join(str(part) for part in (
+            normalize_query(query),
+            self.max_results,
+            self.search_depth,
+            self.include_domains,
+            self.exclude_domains,
+            self.include_answer,
+            self.include_raw_content,
+            self.include_images,
+        ))
+
+    def _run(self, query: str, run_manager=None):
+        result = search_cache.get_or_fetch(
+            self._cache_key(query),
+            lambda: list(super(CachedTavilySearchResults, self)._run(query, run_manager=run_manager)),
+            should_cache=_is_cacheable,
+        )
+        return tuple(result)
+
+    async def _arun(self, query: str, run_manager=None):
+        async def fetch():
+            return list(await super(CachedTavilySearchResults, self)._arun(query, run_manager=run_manager))
+
+        result = await search_cache.aget_or_fetch(self._cache_key(query), fetch, should_cache=_is_cacheable)
+        return tuple(result)
+
+def create_tavily_tool(api_wrapper: TavilySearchAPIWrapper = None):
+    """Create the Tavily search tool"""
+    if api_wrapper is None:
+        # Get the Tavily API key
+        tavily_api_key = get_env_variable('TAVILY_API_KEY')
+        if tavily_api_key is None:
+            raise ValueError("TAVILY_API_KEY is not set in environment variables or secrets")
+
+        # Set the Tavily API key in the environment
+        os.environ['TAVILY_API_KEY'] = tavily_api_key
+        api_wrapper = TavilySearchAPIWrapper()
+
+    # Initialize the Tavily search tool
+    return CachedTavilySearchResults(api_wrapper=api_wrapper, description=tool_description)
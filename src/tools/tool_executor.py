@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Sequence
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from config.performance_config import PERFORMANCE_CONFIG
+
+
+class ToolExecutor:
+    """
+    Runs the tool calls from one model response concurrently.
+
+    Each tool gets its own thread pool, sized to its concurrency limit (at
+    most max_workers) and shared by every agent in the process. Calls beyond
+    a tool's limit wait in that pool's queue without holding a worker, so one
+    slow or rate-limited API can't starve the other tools. A batch has one
+    deadline, and calls still queued when it passes are cancelled unstarted.
+    ToolMessages are returned in the order the model requested them.
+    aexecute applies the same limits with asyncio and tool.ainvoke.
+    """
+
+    def __init__(self, max_workers: int, per_tool_limit: int, timeout: float,
+                 tool_limits: Dict[str, int] = None):
+        self.max_workers = max_workers
+        self.per_tool_limit = per_tool_limit
+        self.timeout = timeout
+        self.tool_limits = tool_limits or {}
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        # Per event loop, since a semaphore only works on the loop it was first used on
+        self._async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _pool(self, tool_name: str) -> ThreadPoolExecutor:
+        """Get the worker pool for a tool, sized to its concurrency limit"""
+        with self._lock:
+            if tool_name not in self._pools:
+                limit = min(self.tool_limits.get(tool_name, self.per_tool_limit), self.max_workers)
+                self._pools[tool_name] = ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f"tool-{tool_name}")
+            return self._pools[tool_name]
+
+    def _async_semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        """Get the concurrency limiter for a tool on the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_semaphores:
+                # Semaphores hold their loop, so the weak keys alone never
+                # let go; drop loops that asyncio.run and friends have closed
+                for closed in [other for other in self._async_semaphores if other.is_closed()]:
+                    del self._async_semaphores[closed]
+            semaphores = self._async_semaphores.setdefault(loop, {})
+            if tool_name not in semaphores:
+                limit = self.tool_limits.get(tool_name, self.per_tool_limit)
+                semaphores[tool_name] = asyncio.Semaphore(limit)
+            return semaphores[tool_name]
+
+    def execute(self, tool_calls: Sequence[Dict[str, Any]], tools_by_name: Dict[str, Any],
+                config: RunnableConfig = None) -> List[ToolMessage]:
+        """
+        Execute tool calls concurrently and return ToolMessages in call order.
+        The node's config is passed on so callbacks and tracing see the tools.
+        """
+        futures = []
+        for tool_call in tool_calls:
+            tool = tools_by_name.get(tool_call["name"])
+            if tool is None:
+                futures.append(None)
+                continue
+            futures.append(self._pool(tool.name).submit(tool.invoke, tool_call["args"], config))
+
+        # One deadline for the whole batch: waiting on earlier results or in a
+        # tool's queue both count, so the node never blocks past timeout
+        deadline = time.monotonic() + self.timeout
+        outputs = []
+        for tool_call, future in zip(tool_calls, futures):
+            if future is None:
+                content = f"Error: unknown tool {tool_call['name']}"
+            else:
+                try:
+                    content = json.dumps(future.result(timeout=max(0.0, deadline - time.monotonic())))
+                except FutureTimeoutError:
+                    future.cancel()
+                    content = f"Error: {tool_call['name']} timed out after {self.timeout}s"
+                except Exception as e:
+                    content = f"Error: {tool_call['name']} failed: {e}"
+            outputs.append(_tool_message(tool_call, content))
+        return outputs
+
+    async def _ainvoke_limited(self, tool, args: Dict[str, Any], config: RunnableConfig = None):
+        """Invoke a tool asynchronously while holding its concurrency slot"""
+        async with self._async_semaphore(tool.name):
+            return await tool.ainvoke(args, config)
+
+    async def _arun_tool(self, tool_call: Dict[str, Any], tools_by_name: Dict[str, Any],
+                         config: RunnableConfig, deadline: float) -> ToolMessage:
+        """Invoke a single tool asynchronously and wrap the result"""
+        tool = tools_by_name.get(tool_call["name"])
+        if tool is None:
+            return _tool_message(tool_call, f"Error: unknown tool {tool_call['name']}")
+        try:
+            # The deadline covers waiting for a slot as well as the call itself
+            result = await asyncio.wait_for(
+                self._ainvoke_limited(tool, tool_call["args"], config), max(0.0, deadline - time.monotonic())
+            )
+            content = json.dumps(result)
+        except asyncio.TimeoutError:
+            content = f"Error: {tool_call['name']} timed out after {self.timeout}s"
+        except Exception as e:
+            content = f"Error: {tool_call['name']} failed: {e}"
+        return _tool_message(tool_call, content)
+
+    async def aexecute(self, tool_calls: Sequence[Dict[str, Any]], tools_by_name: Dict[str, Any],
+                       config: RunnableConfig = None) -> List[ToolMessage]:
+        """Async version of execute; gather keeps the original call order"""
+        deadline = time.monotonic() + self.timeout
+        return list(await asyncio.gather(
+            *(self._arun_tool(tool_call, tools_by_name, config, deadline) for tool_call in tool_calls)
+        ))
+
+
+def _tool_message(tool_call: Dict[str, Any], content: str) -> ToolMessage:
+    """Wrap a tool call's output in a ToolMessage"""
+    return ToolMessage(
+        content=content,
+        name=tool_call["name"],
+        tool_call_id=tool_call["id"],
+    )
+
+
+# Shared by every agent graph in the process
+tool_executor = ToolExecutor(
+    max_workers=PERFORMANCE_CONFIG.tool_max_workers,
+    per_tool_limit=PERFORMANCE_CONFIG.tool_concurrency_limit,
+    timeout=PERFORMANCE_CONFIG.tool_timeout,
+    tool_limits=PERFORMANCE_CONFIG.tool_concurrency_limits,
+)
+
+def execute_tool_calls(tool_calls: Sequence[Dict[str, Any]], tools_by_name: Dict[str, Any],
+                       config: RunnableConfig = None) -> List[ToolMessage]:
+    """Execute tool calls on the shared executor"""
+    return tool_executor.execute(tool_calls, tools_by_name, config)
+
+async def aexecute_tool_calls(tool_calls: Sequence[Dict[str, Any]], tools_by_name: Dict[str, Any],
+                              config: RunnableConfig = None) -> List[ToolMessage]:
+    """Execute tool calls asynchronously on the shared executor"""
+    return await tool_executor.aexecute(tool_calls, tools_by_name, config)
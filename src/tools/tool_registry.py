@@ -1,16 +1,68 @@
-from typing import List
-from .tavily_tool import tavily_tool
-from .dnd_tool import dnd_rules_tool
+import importlib
+import logging
+import threading
+import time
+from typing import Dict, List
 
-# Registry of all available tools
+logger = logging.getLogger(__name__)
+
+# Factories for every known tool, as "module:function" so nothing is imported
+# (and no client is built) until an agent actually needs the tool
+TOOL_FACTORIES = {
+    "tavily_tool": "tools.tavily_tool:create_tavily_tool",
+    "dnd_rules_tool": "tools.dnd_tool:create_dnd_rules_tool",
+}
+
+# Registry of tools offered to agents
 AVAILABLE_TOOLS = {
-    "tavily_tool": tavily_tool,
+    "tavily_tool": TOOL_FACTORIES["tavily_tool"],
 }
 
+# Seconds spent importing and building each tool, recorded on first use
+TOOL_INIT_TIMES: Dict[str, float] = {}
+
+_instances = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+def _build_tool(name: str):
+    """Import a tool's module and call its factory"""
+    module_name, factory_name = TOOL_FACTORIES[name].split(":")
+    start = time.perf_counter()
+    factory = getattr(importlib.import_module(module_name), factory_name)
+    tool = factory()
+    TOOL_INIT_TIMES[name] = time.perf_counter() - start
+    logger.info("Initialized tool %s in %.3fs", name, TOOL_INIT_TIMES[name])
+    return tool
+
+def get_tool(name: str):
+    """Get a tool instance by name, building and caching it on first use"""
+    if name in _instances:
+        return _instances[name]
+    with _registry_lock:
+        lock = _locks.setdefault(name, threading.Lock())
+    # Per-tool lock so concurrent sessions build each client only once
+    with lock:
+        if name not in _instances:
+            _instances[name] = _build_tool(name)
+    return _instances[name]
+
 def get_tools(tool_names: List[str]):
     """Get tool instances by their names"""
     tools = []
     for name in tool_names:
         if name in AVAILABLE_TOOLS:
-            tools.append(AVAILABLE_TOOLS[name])
-    return tools 
\ No newline at end of file
+            tools.append(get_tool(name))
+    return tools
+
+def register_tool(name: str, factory: str, available: bool = True):
+    """Register a "module:function" tool factory, replacing any built instance"""
+    with _registry_lock:
+        TOOL_FACTORIES[name] = factory
+        if available:
+            AVAILABLE_TOOLS[name] = factory
+        _instances.pop(name, None)
+
+def get_tool_init_times() -> Dict[str, float]:
+    """Get the recorded initialization time of each tool built so far"""
+    return dict(TOOL_INIT_TIMES)
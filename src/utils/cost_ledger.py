@@ -0,0 +1,292 @@
+"""
+Token and cost accounting for agent turns.
+
+Usage (from src/):
+    python -m utils.cost_ledger --days 7
+"""
+import argparse
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from config.model_config import AVAILABLE_MODELS
+from config.performance_config import PERFORMANCE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    turns: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, other: "Usage"):
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cost += other.cost
+        self.turns += other.turns
+
+def model_cost(model_id: Optional[str], tokens: int) -> float:
+    """Dollar cost of tokens on a model, or 0 for models without pricing"""
+    model_config = AVAILABLE_MODELS.get(model_id)
+    return tokens / 1000 * model_config.cost_per_1k if model_config else 0.0
+
+def format_dollars(amount: float) -> str:
+    """Dollar amount to the cent, or to a hundredth of a cent below one cent"""
+    if amount == 0 or abs(amount) >= 0.01:
+        return f"${amount:.2f}"
+    if abs(amount) >= 0.0001:
+        return f"${amount:.4f}"
+    return "under $0.0001"
+
+def cheapest_model() -> str:
+    """The available model with the lowest cost per 1k tokens"""
+    return min(AVAILABLE_MODELS, key=lambda model_id: AVAILABLE_MODELS[model_id].cost_per_1k)
+
+def _day_start(timestamp: float) -> float:
+    """Start of the local calendar day containing timestamp"""
+    day = time.localtime(timestamp)
+    return time.mktime((day.tm_year, day.tm_mon, day.tm_mday, 0, 0, 0, 0, 0, -1))
+
+class CostLedger:
+    """
+    Token and cost accounting for agent turns, persisted to SQLite.
+
+    Acts as a trace sink: each finished turn is split into one row per model
+    it called, priced with ModelConfig.cost_per_1k. Running totals per user
+    and day and per thread are kept in memory, seeded from the database on
+    first use, so budget checks never scan the table. Rows are buffered and
+    inserted by a background thread every flush_interval seconds, so a turn
+    doesn't wait on a commit; queries write the buffer first.
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 1.0):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._daily: Dict[tuple, float] = {}
+        self._threads: Dict[str, Usage] = {}
+        self._pending: List[tuple] = []
+        self._closed = threading.Event()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS usage (
+                trace_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                user TEXT,
+                thread_id TEXT,
+                agent TEXT NOT NULL,
+                agent_type TEXT NOT NULL,
+                model TEXT,
+                llm_calls INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                cost REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_usage_user ON usage (user, created_at);
+            CREATE INDEX IF NOT EXISTS idx_usage_thread ON usage (thread_id);
+        """)
+        if flush_interval > 0:
+            threading.Thread(target=self._flush_periodically, name="usage-flush", daemon=True).start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    @staticmethod
+    def turn_usage(trace) -> Dict[Optional[str], dict]:
+        """Tokens, calls and cost per model for one turn"""
+        by_model: Dict[Optional[str], dict] = defaultdict(
+            lambda: {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0}
+        )
+        for span in trace.spans:
+            if span.kind != "llm":
+                continue
+            row = by_model[span.model]
+            row["llm_calls"] += 1
+            row["prompt_tokens"] += span.prompt_tokens
+            row["completion_tokens"] += span.completion_tokens
+            row["cost"] += model_cost(span.model, span.prompt_tokens + span.completion_tokens)
+        return dict(by_model)
+
+    def emit(self, trace):
+        """Record a finished turn"""
+        by_model = self.turn_usage(trace)
+        if not by_model:
+            return
+        turn = Usage(
+            prompt_tokens=sum(row["prompt_tokens"] for row in by_model.values()),
+            completion_tokens=sum(row["completion_tokens"] for row in by_model.values()),
+            cost=sum(row["cost"] for row in by_model.values()),
+            turns=1,
+        )
+        with self._lock:
+            self._pending.extend(
+                (trace.trace_id, trace.started_at, trace.user, trace.thread_id, trace.agent,
+                 trace.agent_type, model, row["llm_calls"], row["prompt_tokens"],
+                 row["completion_tokens"], row["cost"])
+                for model, row in by_model.items()
+            )
+            day_key = (trace.user, _day_start(trace.started_at))
+            if day_key in self._daily:
+                self._daily[day_key] += turn.cost
+            if trace.thread_id in self._threads:
+                self._threads[trace.thread_id].add(turn)
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def _write_pending(self):
+        """Insert buffered rows; caller holds the lock"""
+        if not self._pending:
+            return
+        self._conn.executemany(
+            "INSERT INTO usage (trace_id, created_at, user, thread_id, agent, agent_type, model, "
+            "llm_calls, prompt_tokens, completion_tokens, cost) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._pending,
+        )
+        self._conn.commit()
+        self._pending = []
+
+    def flush(self):
+        """Write buffered rows"""
+        with self._lock:
+            self._write_pending()
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+
+    def _query_usage(self, where: str, params: tuple) -> Usage:
+        """Sum usage rows matching a filter; caller holds the lock"""
+        self._write_pending()
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0), "
+            f"COALESCE(SUM(cost), 0), COUNT(DISTINCT trace_id) FROM usage WHERE {where}",
+            params,
+        ).fetchone()
+        return Usage(*row)
+
+    def thread_usage(self, thread_id: str) -> Usage:
+        """Totals for one chat session"""
+        with self._lock:
+            if thread_id not in self._threads:
+                self._threads[thread_id] = self._query_usage("thread_id = ?", (thread_id,))
+            usage = self._threads[thread_id]
+            return Usage(usage.prompt_tokens, usage.completion_tokens, usage.cost, usage.turns)
+
+    def spent_today(self, user: str) -> float:
+        """Dollars a user has spent since local midnight"""
+        day = _day_start(time.time())
+        with self._lock:
+            if (user, day) not in self._daily:
+                # Earlier days can't change any more, so don't keep them
+                for key in [key for key in self._daily if key[1] < day]:
+                    del self._daily[key]
+                self._daily[(user, day)] = self._query_usage(
+                    "user = ? AND created_at >= ?", (user, day)
+                ).cost
+            return self._daily[(user, day)]
+
+    def agent_usage(self, since: float = 0.0) -> List[dict]:
+        """Per-agent totals, most expensive first, to spot runaway tool loops"""
+        with self._lock:
+            self._write_pending()
+            rows = self._conn.execute(
+                "SELECT agent, agent_type, COUNT(DISTINCT trace_id), SUM(llm_calls), "
+                "SUM(prompt_tokens + completion_tokens), SUM(cost) FROM usage "
+                "WHERE created_at >= ? GROUP BY agent, agent_type ORDER BY SUM(cost) DESC",
+                (since,),
+            ).fetchall()
+        return [
+            {"agent": agent, "agent_type": agent_type, "turns": turns,
+             "llm_calls_per_turn": calls / turns if turns else 0.0, "tokens": tokens, "cost": cost}
+            for agent, agent_type, turns, calls, tokens, cost in rows
+        ]
+
+    def user_usage(self, since: float = 0.0) -> List[dict]:
+        """Per-user totals, most expensive first, for capacity planning"""
+        with self._lock:
+            self._write_pending()
+            rows = self._conn.execute(
+                "SELECT user, COUNT(DISTINCT trace_id), SUM(prompt_tokens), SUM(completion_tokens), "
+                "SUM(cost) FROM usage WHERE created_at >= ? GROUP BY user ORDER BY SUM(cost) DESC",
+                (since,),
+            ).fetchall()
+        return [
+            {"user": user, "turns": turns, "prompt_tokens": prompt_tokens,
+             "completion_tokens": completion_tokens, "cost": cost}
+            for user, turns, prompt_tokens, completion_tokens, cost in rows
+        ]
+
+    def budget(self, user: str) -> float:
+        """A user's daily budget in dollars; 0 means unlimited"""
+        return PERFORMANCE_CONFIG.cost_budgets.get(user, PERFORMANCE_CONFIG.cost_budget_daily)
+
+    def check_budget(self, user: str) -> Optional[str]:
+        """The configured budget action if the user is over budget, else None"""
+        budget = self.budget(user)
+        if not user or budget <= 0 or self.spent_today(user) < budget:
+            return None
+        if PERFORMANCE_CONFIG.cost_budget_action not in ("downgrade", "refuse"):
+            raise ValueError(f"Unknown budget action: {PERFORMANCE_CONFIG.cost_budget_action}")
+        return PERFORMANCE_CONFIG.cost_budget_action
+
+_cost_ledger = None
+_ledger_lock = threading.Lock()
+
+def get_cost_ledger() -> CostLedger:
+    """Get the process-wide cost ledger"""
+    global _cost_ledger
+    with _ledger_lock:
+        if _cost_ledger is None:
+            _cost_ledger = CostLedger(PERFORMANCE_CONFIG.usage_db_path, PERFORMANCE_CONFIG.usage_flush_interval)
+            # Don't lose the last unwritten turns on shutdown
+            atexit.register(_cost_ledger.flush)
+        return _cost_ledger
+
+_no_fallback_warned = set()
+
+def budget_fallback_model(model_id: str) -> Optional[str]:
+    """Model to downgrade model_id to when a user is over budget, or None if none is cheaper"""
+    fallback = PERFORMANCE_CONFIG.cost_budget_fallback_model or cheapest_model()
+    current, candidate = AVAILABLE_MODELS.get(model_id), AVAILABLE_MODELS.get(fallback)
+    if current is not None and candidate is not None and candidate.cost_per_1k < current.cost_per_1k:
+        return fallback
+    if model_id not in _no_fallback_warned:
+        _no_fallback_warned.add(model_id)
+        logger.warning("No model cheaper than %s to downgrade to; over-budget turns will be refused", model_id)
+    return None
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Report token usage and cost per agent and per user")
+    parser.add_argument("--days", type=float, default=1.0, help="How far back to report")
+    parser.add_argument("--db-path", default=PERFORMANCE_CONFIG.usage_db_path)
+    args = parser.parse_args(argv)
+
+    ledger = CostLedger(args.db_path, flush_interval=0)
+    since = time.time() - args.days * 86400
+    print(f"{'agent':30} {'type':16} {'turns':>8} {'calls/turn':>10} {'tokens':>12} {'cost':>10}")
+    for row in ledger.agent_usage(since):
+        print(f"{row['agent']:30} {row['agent_type']:16} {row['turns']:8} {row['llm_calls_per_turn']:10.2f} "
+              f"{row['tokens']:12,} {format_dollars(row['cost']):>10}")
+    print()
+    print(f"{'user':30} {'turns':>8} {'prompt':>12} {'completion':>12} {'cost':>10}")
+    for row in ledger.user_usage(since):
+        print(f"{row['user'] or '-':30} {row['turns']:8} {row['prompt_tokens']:12,} "
+              f"{row['completion_tokens']:12,} {format_dollars(row['cost']):>10}")
+
+if __name__ == "__main__":
+    main()
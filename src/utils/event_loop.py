@@ -0,0 +1,61 @@
+import asyncio
+import queue
+import threading
+from typing import AsyncIterator, Coroutine, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_loop = None
+_lock = threading.Lock()
+_DONE = object()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the long-lived background event loop, starting it on first use"""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="agent-event-loop", daemon=True)
+            thread.start()
+        return _loop
+
+def run_async(coro: Coroutine, timeout: float = None):
+    """Run a coroutine on the background loop and wait for its result"""
+    future = asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+def iterate_async(async_iterator: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Consume an async iterator from synchronous code.
+
+    The iterator runs on the background loop and hands items over through a
+    queue, so the calling thread only blocks while waiting for the next item.
+    """
+    items: queue.Queue = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in async_iterator:
+                items.put(item)
+        except BaseException as e:
+            items.put(e)
+            raise
+        finally:
+            items.put(_DONE)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_event_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Stop the producer if the consumer stops early
+        future.cancel()
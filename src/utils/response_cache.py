@@ -0,0 +1,172 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+import numpy as np
+from config.performance_config import PERFORMANCE_CONFIG
+
+@dataclass
+class CacheHit:
+    response: str
+    tier: str  # "exact" or "semantic"
+    similarity: float = 1.0
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivially different phrasings share a key"""
+    prompt = re.sub(r"\s+", " ", prompt.strip().lower())
+    return prompt.rstrip("?!. ")
+
+def context_key(messages: Sequence[Dict[str, str]], turns: int) -> str:
+    """Hash of the last few chat turns, so cached answers respect context"""
+    if turns <= 0:
+        return ""
+    recent = messages[-2 * turns:] if messages else []
+    payload = "\n".join(f"{m['role']}:{normalize_prompt(m['content'])}" for m in recent)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier cache of final agent responses stored in SQLite.
+
+    The exact tier is keyed by agent config hash, context hash and normalized
+    prompt. If embeddings are configured, a miss falls back to the most
+    similar cached prompt for the same agent and context, provided its cosine
+    similarity is above the threshold. Entries expire after ttl seconds and
+    the least recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(self, db_path: str, ttl: float, max_entries: int,
+                 similarity_threshold: float, embeddings=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embeddings = embeddings
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"exact": 0, "semantic": 0, "miss": 0})
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                agent_key TEXT NOT NULL,
+                context_key TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses (agent_key, context_key);
+            CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+        """)
+
+    @staticmethod
+    def _key(agent_key: str, context: str, prompt: str) -> str:
+        """Exact-match key for a prompt"""
+        payload = f"{agent_key}\n{context}\n{normalize_prompt(prompt)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _embed(self, prompt: str) -> np.ndarray:
+        """Embed a prompt as a unit vector"""
+        vector = np.asarray(self.embeddings.embed_query(normalize_prompt(prompt)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, agent_key: str, prompt: str, context: str = "") -> Optional[CacheHit]:
+        """Find a cached response for a prompt"""
+        now = time.time()
+        key = self._key(agent_key, context, prompt)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self._stats[agent_key]["exact"] += 1
+                return CacheHit(response=row[0], tier="exact")
+
+        hit = self._semantic_lookup(agent_key, prompt, context, now) if self.embeddings else None
+        with self._lock:
+            self._stats[agent_key]["semantic" if hit else "miss"] += 1
+        return hit
+
+    def _semantic_lookup(self, agent_key: str, prompt: str, context: str, now: float) -> Optional[CacheHit]:
+        """Find the most similar cached prompt above the threshold"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, response, embedding FROM responses "
+                "WHERE agent_key = ? AND context_key = ? AND created_at > ? AND embedding IS NOT NULL",
+                (agent_key, context, now - self.ttl),
+            ).fetchall()
+        if not rows:
+            return None
+
+        query = self._embed(prompt)
+        matrix = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        scores = matrix @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+
+        with self._lock:
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, rows[best][0]))
+            self._conn.commit()
+        return CacheHit(response=rows[best][1], tier="semantic", similarity=float(scores[best]))
+
+    def store(self, agent_key: str, prompt: str, response: str, context: str = ""):
+        """Cache a response and evict expired or excess entries"""
+        now = time.time()
+        embedding = self._embed(prompt).tobytes() if self.embeddings else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, agent_key, context_key, prompt, response, embedding, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(agent_key, context, prompt), agent_key, context,
+                 normalize_prompt(prompt), response, embedding, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self, agent_key: str) -> Dict[str, int]:
+        """Hit and miss counters for an agent configuration"""
+        with self._lock:
+            return dict(self._stats[agent_key])
+
+_response_cache = None
+_cache_lock = threading.Lock()
+
+def _create_embeddings(model_name: str):
+    """Create the embeddings used by the semantic tier"""
+    from tools.embedders import create_embeddings
+    return create_embeddings("huggingface-api", model_name)
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache"""
+    global _response_cache
+    with _cache_lock:
+        if _response_cache is None:
+            model_name = PERFORMANCE_CONFIG.response_cache_embedding_model
+            _response_cache = ResponseCache(
+                db_path=PERFORMANCE_CONFIG.response_cache_db_path,
+                ttl=PERFORMANCE_CONFIG.response_cache_ttl,
+                max_entries=PERFORMANCE_CONFIG.response_cache_max_entries,
+                similarity_threshold=PERFORMANCE_CONFIG.response_cache_similarity_threshold,
+                embeddings=_create_embeddings(model_name) if model_name else None,
+            )
+        return _response_cache
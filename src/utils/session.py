@@ -1,30 +1,192 @@
 import streamlit as st
+import time
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional
+from config.performance_config import PERFORMANCE_CONFIG
+from utils.storage import Storage, get_storage
+
+class ChatMessage(NamedTuple):
+    """One chat message as shown in the UI"""
+    role: str
+    content: str
+    trace: Optional[dict] = None  # summary of the turn's trace, for assistant messages
+    key: str = ""  # stable id for render caching
+
+@dataclass
+class ChatSession:
+    """The chat with one agent: its messages and checkpoint thread"""
+    id: str
+    agent: str
+    thread_id: str
+    messages: List[ChatMessage] = field(default_factory=list)
+    pending_job: Optional[str] = None
+    last_used: float = field(default_factory=time.time)
+    has_earlier: bool = False  # older messages exist in storage than those in memory
+    visible: int = field(default_factory=lambda: PERFORMANCE_CONFIG.chat_window_size)  # messages rendered
+
+    def add_message(self, role: str, content: str, trace: dict = None):
+        """Append a message, dropping the oldest past session_max_messages"""
+        self.messages.append(ChatMessage(role, content, trace, uuid.uuid4().hex))
+        # The full history stays in the checkpoint thread
+        overflow = len(self.messages) - PERFORMANCE_CONFIG.session_max_messages
+        if overflow > 0:
+            del self.messages[:overflow]
+            self.has_earlier = True
+
+    def history(self, turns: int) -> List[Dict[str, str]]:
+        """The last turns user/assistant pairs as {"role", "content"} dicts"""
+        recent = self.messages[-2 * turns:] if turns > 0 else []
+        return [{"role": message.role, "content": message.content} for message in recent]
+
+    def load(self, storage: Storage, count: int):
+        """Replace the messages in memory with the thread's last count stored messages"""
+        stored = storage.get_messages(self.thread_id, count)
+        self.messages = [
+            ChatMessage(message.role, message.content, message.trace, f"stored-{message.id}") for message in stored
+        ]
+        self.has_earlier = len(stored) == count
+
+    def load_earlier(self, storage: Storage, page_size: int):
+        """Page another page_size older messages in from storage"""
+        self.load(storage, len(self.messages) + page_size)
+
+    def window(self) -> List[ChatMessage]:
+        """The newest visible messages, which are all that gets rendered"""
+        return self.messages[-self.visible:] if self.visible > 0 else []
+
+    def show_earlier(self, storage: Optional[Storage], count: int):
+        """Widen the window by count, paging from storage once memory runs out"""
+        if len(self.messages) - self.visible < count and self.has_earlier and storage is not None:
+            self.load_earlier(storage, max(count, PERFORMANCE_CONFIG.session_page_size))
+        self.visible += count
+
+    @property
+    def hidden(self) -> bool:
+        """Whether there are older messages than the window shows"""
+        return len(self.messages) > self.visible or self.has_earlier
+
+class SessionStore:
+    """
+    A browser session's chats, indexed by id and by agent.
+
+    Each agent has at most one active session, so switching back to an agent
+    resumes its chat instead of starting another. Sessions idle for longer
+    than idle_ttl, and the least recently used ones beyond max_sessions, are
+    dropped; the current session and ones with a turn in flight are kept.
+
+    With storage, an agent's first activation reopens the user's most recent
+    thread for it, loading only the newest page of messages, and dropped
+    sessions can be reopened the same way.
+    """
+
+    def __init__(self, max_sessions: int, idle_ttl: float, storage: Storage = None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.storage = storage
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()  # least recently used first
+        self._by_agent: Dict[str, str] = {}
+        self.current_agent: Optional[str] = None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        return self._sessions.get(session_id)
+
+    def for_agent(self, agent_name: str) -> Optional[ChatSession]:
+        session_id = self._by_agent.get(agent_name)
+        return self._sessions.get(session_id) if session_id else None
+
+    def current(self) -> Optional[ChatSession]:
+        """The session for the selected agent"""
+        return self.for_agent(self.current_agent) if self.current_agent else None
+
+    def activate(self, agent_name: str, user: str = None) -> ChatSession:
+        """Make agent_name current, resuming its session or starting one"""
+        session = self.for_agent(agent_name)
+        if session is None:
+            session = self._open(agent_name, user)
+            self._sessions[session.id] = session
+            self._by_agent[agent_name] = session.id
+        session.last_used = time.time()
+        self._sessions.move_to_end(session.id)
+        self.current_agent = agent_name
+        self._evict()
+        return session
+
+    def _open(self, agent_name: str, user: str = None) -> ChatSession:
+        """Session for the user's latest stored thread with an agent, or a new one"""
+        session = ChatSession(id=str(uuid.uuid4()), agent=agent_name, thread_id=str(uuid.uuid4()))
+        if self.storage is None or user is None:
+            return session
+        threads = self.storage.list_threads(user, agent_name, limit=1)
+        if threads:
+            session.thread_id = threads[0]["thread_id"]
+            session.load(self.storage, PERFORMANCE_CONFIG.session_page_size)
+        else:
+            self.storage.create_thread(user, agent_name, session.thread_id)
+        return session
+
+    def reset(self, session: ChatSession, user: str = None):
+        """Start the session over in a fresh checkpoint thread"""
+        from agents.checkpointing import delete_thread
+        delete_thread(session.thread_id)
+        session.messages = []
+        session.has_earlier = False
+        session.visible = PERFORMANCE_CONFIG.chat_window_size
+        session.thread_id = str(uuid.uuid4())
+        if self.storage is not None and user is not None:
+            self.storage.create_thread(user, session.agent, session.thread_id)
+
+    def _evict(self):
+        cutoff = time.time() - self.idle_ttl
+        for session in list(self._sessions.values()):
+            over_limit = len(self._sessions) > self.max_sessions
+            if not over_limit and session.last_used >= cutoff:
+                break
+            if session.agent != self.current_agent and session.pending_job is None:
+                self.remove(session.id)
+
+    def remove(self, session_id: str):
+        """Drop a session"""
+        session = self._sessions.pop(session_id, None)
+        if session and self._by_agent.get(session.agent) == session_id:
+            del self._by_agent[session.agent]
+        if session and PERFORMANCE_CONFIG.checkpoint_backend == "memory":
+            # In-memory checkpoints hold every step of the thread; a reopened
+            # session is rebuilt from storage instead
+            from agents.checkpointing import delete_thread
+            delete_thread(session.thread_id)
 
 def init_session_state():
     """Initialize session state variables"""
-    if "sessions" not in st.session_state:
-        st.session_state.sessions = {}
-    if "current_session" not in st.session_state:
-        st.session_state.current_session = None
+    if "session_store" not in st.session_state:
+        st.session_state.session_store = SessionStore(
+            PERFORMANCE_CONFIG.session_max_count, PERFORMANCE_CONFIG.session_idle_ttl, get_storage()
+        )
+
+def get_session_store() -> SessionStore:
+    """This browser session's chat sessions"""
+    return st.session_state.session_store
 
 def get_current_session():
     """Get current session details"""
-    current_session_id = next(
-        (sid for sid, s in st.session_state.sessions.items() 
-         if s["agent"] == st.session_state.current_session),
-        None
-    )
-    return current_session_id, st.session_state.sessions.get(current_session_id) if current_session_id else (None, None)
-
-def create_new_session(agent_name, agent_config, agent_instance):
-    """Create a new agent session"""
-    session_id = str(uuid.uuid4())
-    st.session_state.sessions[session_id] = {
-        "agent": agent_name,
-        "agent_config": agent_config,
-        "messages": [],
-        "thread_id": str(uuid.uuid4()),
-        "memory": agent_instance.get_memory()
-    }
-    st.session_state.current_session = agent_name
+    session = get_session_store().current()
+    if session is None:
+        return None, None
+    session.last_used = time.time()
+    return session.id, session
+
+def activate_session(agent_name):
+    """Switch to an agent's session, starting one if needed"""
+    return get_session_store().activate(agent_name, st.session_state.username)
+
+def reset_session(session):
+    """Clear a session's chat and start a new thread"""
+    get_session_store().reset(session, st.session_state.username)
+
+def show_earlier_messages(session):
+    """Widen a session's chat window by one page"""
+    session.show_earlier(get_session_store().storage, PERFORMANCE_CONFIG.chat_window_size)
@@ -0,0 +1,270 @@
+import atexit
+import dataclasses
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from config.agent_config import AgentConfig
+from config.performance_config import PERFORMANCE_CONFIG
+
+class StoredMessage(NamedTuple):
+    """A chat message as persisted; id orders messages within a thread"""
+    role: str
+    content: str
+    trace: Optional[dict] = None
+    id: Optional[int] = None
+
+class Storage(ABC):
+    """
+    Persistent users, user-created agent configs, threads and messages.
+
+    Shared by every session and replica pointed at the same backend, so chat
+    history and agents survive a refresh and don't pile up in memory.
+    """
+
+    @abstractmethod
+    def touch_user(self, username: str):
+        """Record a login, creating the user on first sight"""
+
+    @abstractmethod
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        """A user's record, or None"""
+
+    @abstractmethod
+    def save_agent(self, username: str, agent_config: AgentConfig):
+        """Create or replace one of a user's agents"""
+
+    @abstractmethod
+    def get_agents(self, username: str) -> Dict[str, AgentConfig]:
+        """A user's agents by name"""
+
+    @abstractmethod
+    def create_thread(self, username: str, agent: str, thread_id: str) -> Dict[str, Any]:
+        """Register a new thread"""
+
+    @abstractmethod
+    def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        """A thread's record, or None"""
+
+    @abstractmethod
+    def list_threads(self, username: str, agent: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """A user's threads, most recently active first"""
+
+    @abstractmethod
+    def append_messages(self, thread_id: str, messages: Sequence[StoredMessage]):
+        """Add messages to the end of a thread; may be written in a later batch"""
+
+    @abstractmethod
+    def get_messages(self, thread_id: str, limit: int, before: int = None) -> List[StoredMessage]:
+        """Up to limit messages preceding message id before (default: the newest), oldest first"""
+
+    def flush(self):
+        """Write any buffered messages"""
+
+    def close(self):
+        """Flush and release the backend"""
+        self.flush()
+
+class SqliteStorage(Storage):
+    """
+    Storage in a SQLite file.
+
+    Messages from the chat path are buffered and inserted in batches, once
+    batch_size have accumulated or flush_interval seconds have passed, so a
+    turn doesn't wait on a commit. Reads flush first, so they always see
+    earlier writes.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 50, flush_interval: float = 1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._touched: Dict[str, float] = {}
+        self._closed = threading.Event()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (
+                username TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                last_login REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS agents (
+                username TEXT NOT NULL,
+                name TEXT NOT NULL,
+                config TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (username, name)
+            );
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                agent TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_threads_user ON threads (username, agent, updated_at);
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                thread_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                trace TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_thread ON messages (thread_id, id);
+        """)
+        if flush_interval > 0:
+            threading.Thread(target=self._flush_periodically, name="storage-flush", daemon=True).start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def touch_user(self, username: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO users (username, created_at, last_login) VALUES (?, ?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET last_login = excluded.last_login",
+                (username, now, now),
+            )
+            self._conn.commit()
+
+    def get_user(self, username: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT username, created_at, last_login FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        return dict(zip(("username", "created_at", "last_login"), row)) if row else None
+
+    def save_agent(self, username: str, agent_config: AgentConfig):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO agents (username, name, config, updated_at) VALUES (?, ?, ?, ?)",
+                (username, agent_config.name, json.dumps(dataclasses.asdict(agent_config)), time.time()),
+            )
+            self._conn.commit()
+
+    def get_agents(self, username: str) -> Dict[str, AgentConfig]:
+        from config.user_agents import UserAgent
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, config FROM agents WHERE username = ? ORDER BY updated_at", (username,)
+            ).fetchall()
+        return {name: UserAgent(**json.loads(config)) for name, config in rows}
+
+    def create_thread(self, username: str, agent: str, thread_id: str) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO threads (thread_id, username, agent, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (thread_id, username, agent, now, now),
+            )
+            self._conn.commit()
+        return {"thread_id": thread_id, "user": username, "agent": agent, "created_at": now, "updated_at": now}
+
+    def _thread_rows(self, where: str, params: tuple) -> List[Dict[str, Any]]:
+        """Threads matching a filter, newest first; flushes buffered messages first"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, username, agent, created_at, updated_at FROM threads "
+                f"WHERE {where} ORDER BY updated_at DESC LIMIT ?",
+                params,
+            ).fetchall()
+        return [dict(zip(("thread_id", "user", "agent", "created_at", "updated_at"), row)) for row in rows]
+
+    def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._thread_rows("thread_id = ?", (thread_id, 1))
+        return rows[0] if rows else None
+
+    def list_threads(self, username: str, agent: str = None, limit: int = 50) -> List[Dict[str, Any]]:
+        if agent is None:
+            return self._thread_rows("username = ?", (username, limit))
+        return self._thread_rows("username = ? AND agent = ?", (username, agent, limit))
+
+    def append_messages(self, thread_id: str, messages: Sequence[StoredMessage]):
+        now = time.time()
+        with self._lock:
+            self._pending.extend(
+                (thread_id, message.role, message.content,
+                 json.dumps(message.trace) if message.trace is not None else None, now)
+                for message in messages
+            )
+            self._touched[thread_id] = now
+            full = len(self._pending) >= self.batch_size
+        if full or self.flush_interval <= 0:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            self._conn.executemany(
+                "INSERT INTO messages (thread_id, role, content, trace, created_at) VALUES (?, ?, ?, ?, ?)",
+                self._pending,
+            )
+            self._conn.executemany(
+                "UPDATE threads SET updated_at = ? WHERE thread_id = ?",
+                [(updated_at, thread_id) for thread_id, updated_at in self._touched.items()],
+            )
+            self._conn.commit()
+            self._pending = []
+            self._touched = {}
+
+    def get_messages(self, thread_id: str, limit: int, before: int = None) -> List[StoredMessage]:
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content, trace, id FROM messages WHERE thread_id = ? AND id < ? "
+                "ORDER BY id DESC LIMIT ?",
+                (thread_id, before if before is not None else 2 ** 63 - 1, limit),
+            ).fetchall()
+        return [
+            StoredMessage(role, content, json.loads(trace) if trace else None, message_id)
+            for role, content, trace, message_id in reversed(rows)
+        ]
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+def create_storage(backend: str, db_path: str = None) -> Optional[Storage]:
+    """Create a storage backend; an empty backend name disables storage"""
+    if not backend:
+        return None
+    if backend == "sqlite":
+        return SqliteStorage(
+            db_path or PERFORMANCE_CONFIG.storage_db_path,
+            batch_size=PERFORMANCE_CONFIG.storage_batch_size,
+            flush_interval=PERFORMANCE_CONFIG.storage_flush_interval,
+        )
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+_storage = None
+_storage_created = False
+_storage_lock = threading.Lock()
+
+def get_storage() -> Optional[Storage]:
+    """Get the process-wide storage, or None if it's disabled"""
+    global _storage, _storage_created
+    with _storage_lock:
+        if not _storage_created:
+            _storage = create_storage(PERFORMANCE_CONFIG.storage_backend)
+            _storage_created = True
+            if _storage is not None:
+                # Don't lose the last unflushed batch on shutdown
+                atexit.register(_storage.flush)
+        return _storage
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Iterable
+from langchain_core.messages import BaseMessage
+
+# Approximate per-message overhead for role and separators in chat formats
+MESSAGE_OVERHEAD_TOKENS = 4
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Load the tokenizer once per process, or None if tiktoken is unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Count tokens in a piece of text"""
+    if not text:
+        return 0
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        # Roughly four characters per token for English text
+        return len(text) // 4 + 1
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+def message_text(message: BaseMessage) -> str:
+    """Get the text of a message, flattening content blocks"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+def count_message_tokens(message: BaseMessage) -> int:
+    """Count tokens for a single chat message, including tool call arguments"""
+    tokens = count_tokens(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+    for tool_call in getattr(message, "tool_calls", None) or []:
+        tokens += count_tokens(f"{tool_call['name']}{tool_call['args']}")
+    return tokens
+
+def count_messages_tokens(messages: Iterable[BaseMessage]) -> int:
+    """Count tokens for a list of chat messages"""
+    return sum(count_message_tokens(message) for message in messages)